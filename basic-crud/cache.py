@@ -0,0 +1,85 @@
+"""
+Cache of pre-encoded JSON for stored items.
+
+Reads are far more common than writes, so instead of validating and encoding
+an item on every GET, its JSON bytes are kept here together with the store
+version they were encoded from. A cached entry is only served while the
+store still reports that version, which keeps the cache correct even when
+another worker changes the item in the shared store. Writes in this process
+also drop the entry right away via `invalidate()`.
+"""
+
+import threading
+from typing import Iterable, Iterator, Optional
+
+from pydantic import TypeAdapter
+
+from schemas import Item, StoredItem
+
+_stored_item = TypeAdapter(StoredItem)
+
+
+def encode_item(item_id: int, item: Item) -> bytes:
+    """
+    Encode an item and its ID as the JSON the API returns for it.
+    """
+    return _stored_item.dump_json(StoredItem.model_construct(id=item_id, **item.__dict__))
+
+
+class JsonCache:
+    def __init__(self, store, max_entries: int = 100_000):
+        self._store = store
+        self._max_entries = max_entries
+        self._entries: dict[int, tuple[int, bytes]] = {}
+        # Lookups are plain dict reads; only changes to the dict are serialized.
+        self._lock = threading.Lock()
+
+    def get(self, item_id: int) -> Optional[bytes]:
+        """
+        Return the JSON for the item stored under `item_id`, or None if there is none.
+        """
+        version = self._store.version(item_id)
+        if version is None:
+            return None
+        entry = self._entries.get(item_id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        # Read the item only after its version: if it changes in between, the
+        # entry is filed under the older version and simply re-encoded next time.
+        item = self._store.get(item_id)
+        if item is None:
+            return None
+        data = encode_item(item_id, item)
+        self._put(item_id, version, data)
+        return data
+
+    def fragments(self, rows: Iterable[tuple[int, int, Item]]) -> Iterator[tuple[int, bytes]]:
+        """
+        Yield (id, JSON) for each (id, version, item) row, in order.
+
+        The rows come from a listing of the store (`versioned_items()` or
+        `versioned_price_range()`), so each body is encoded from the very item
+        the listing read, and cached under the version read with it: the store
+        is not consulted again per item.
+        """
+        for item_id, version, item in rows:
+            entry = self._entries.get(item_id)
+            if entry is not None and entry[0] == version:
+                yield item_id, entry[1]
+                continue
+            data = encode_item(item_id, item)
+            # Rows from an older listing must not replace a newer entry.
+            if entry is None or entry[0] < version:
+                self._put(item_id, version, data)
+            yield item_id, data
+
+    def invalidate(self, item_id: int):
+        with self._lock:
+            self._entries.pop(item_id, None)
+
+    def _put(self, item_id: int, version: int, data: bytes):
+        with self._lock:
+            if item_id not in self._entries and len(self._entries) >= self._max_entries:
+                # Evict the oldest entry (dicts keep insertion order).
+                del self._entries[next(iter(self._entries))]
+            self._entries[item_id] = (version, data)
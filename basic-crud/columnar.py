@@ -0,0 +1,398 @@
+"""
+Columnar item storage in a shared memory segment.
+
+Instead of one pydantic object per item, every field lives in a typed column:
+IDs, prices and taxes are packed into 8-byte arrays, and names and
+descriptions are stored as (offset, length) pairs pointing into a single
+UTF-8 string arena. Items are only turned back into `Item` models when they
+are read through the API.
+
+The columns live in a `multiprocessing.shared_memory` segment, so every
+uvicorn worker that opens the store under the same name reads and writes the
+same dataset. Writers in different processes are serialized with an
+`fcntl.flock` on a lock file next to the segment (POSIX only).
+
+Slots are assigned in ID order and IDs are never reused, so the ID column is
+always sorted and a lookup is a binary search over it. Deleted slots and
+strings orphaned by updates are reclaimed by compaction, which runs when
+dead slots outnumber live ones or the segment runs out of room.
+"""
+
+import fcntl
+import math
+import os
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, Optional
+
+import numpy as np
+
+from schemas import Item
+
+# Header: magic, capacity, arena_size, count, live, next_id, arena_used, arena_garbage, clock
+_HEADER_FIELDS = 9
+_HEADER_SIZE = _HEADER_FIELDS * 8
+_MAGIC = int.from_bytes(b"BCITEMS2", "little")
+_CAPACITY, _ARENA_SIZE, _COUNT, _LIVE, _NEXT_ID, _ARENA_USED, _ARENA_GARBAGE, _CLOCK = range(1, 9)
+
+# How many rows items() copies out per trip through the lock.
+_SCAN_BATCH = 1024
+
+
+class StoreFullError(Exception):
+    """
+    Raised when an item does not fit in the shared segment, even after compaction.
+    """
+
+
+def _segment_size(capacity: int, arena_size: int) -> int:
+    # ids, versions, prices, taxes, name offsets, description offsets (8 bytes each),
+    # name and description lengths (4 bytes each), alive flags (1 byte).
+    return _HEADER_SIZE + capacity * (6 * 8 + 2 * 4 + 1) + arena_size
+
+
+class SharedColumnStore:
+    def __init__(self, name: str = "basic-crud-items", capacity: int = 100_000, arena_size: int = 64 * 1024 * 1024):
+        self._lock_file = open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a+b")
+        self._thread_lock = threading.Lock()
+        with self._locked():
+            try:
+                self._shm = _open_segment(name, create=True, size=_segment_size(capacity, arena_size))
+            except FileExistsError:
+                self._shm = _open_segment(name)
+            self._header = self._shm.buf[:_HEADER_SIZE].cast("q")
+            if self._header[0] == 0:
+                # Fresh segment: the memory is zero-filled, so only the layout needs recording.
+                self._header[_CAPACITY] = capacity
+                self._header[_ARENA_SIZE] = arena_size
+                self._header[0] = _MAGIC
+            elif self._header[0] != _MAGIC:
+                raise RuntimeError(f"Shared memory segment {name!r} has an incompatible layout")
+            self._map_columns(self._header[_CAPACITY], self._header[_ARENA_SIZE])
+
+    def _map_columns(self, capacity: int, arena_size: int):
+        buf = self._shm.buf
+        offset = _HEADER_SIZE
+
+        def column(fmt: str, width: int):
+            nonlocal offset
+            view = buf[offset : offset + capacity * width].cast(fmt)
+            offset += capacity * width
+            return view
+
+        self._ids = column("q", 8)
+        self._versions = column("q", 8)
+        self._prices = column("d", 8)
+        self._taxes = column("d", 8)
+        self._name_offsets = column("q", 8)
+        self._desc_offsets = column("q", 8)
+        self._name_lengths = column("i", 4)
+        self._desc_lengths = column("i", 4)
+        self._alive = column("B", 1)
+        self._arena = buf[offset : offset + arena_size]
+        self._capacity = capacity
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        return self._header[_LIVE]
+
+    def create(self, item: Item) -> int:
+        """
+        Store a new item and return the ID assigned to it.
+        """
+        return self.bulk_create([item])[0]
+
+    def bulk_create(self, items: list[Item]) -> list[int]:
+        """
+        Store several items at once and return their IDs. Either all of them
+        are stored or, if they do not fit, none are.
+        """
+        encoded = [_encode(item) for item in items]
+        with self._locked():
+            self._reserve(len(items), sum(_size(name, description) for name, description in encoded))
+            item_ids = []
+            for item, (name, description) in zip(items, encoded):
+                slot = self._header[_COUNT]
+                item_id = self._header[_NEXT_ID]
+                self._ids[slot] = item_id
+                self._write(slot, item, name, description)
+                self._alive[slot] = 1
+                self._header[_COUNT] = slot + 1
+                self._header[_LIVE] += 1
+                self._header[_NEXT_ID] = item_id + 1
+                item_ids.append(item_id)
+            return item_ids
+
+    def get(self, item_id: int) -> Optional[Item]:
+        """
+        Return the item stored under `item_id`, or None if there is none.
+        """
+        with self._locked():
+            slot = self._find(item_id)
+            return None if slot < 0 else self._read(slot)
+
+    def version(self, item_id: int) -> Optional[int]:
+        """
+        Return the current version of the item stored under `item_id`, or None if there is none.
+        Versions come from a counter shared by all workers, so a change made by
+        any of them is visible here.
+        """
+        with self._locked():
+            slot = self._find(item_id)
+            return None if slot < 0 else self._versions[slot]
+
+    def update(self, item_id: int, item: Item) -> bool:
+        """
+        Replace the item stored under `item_id`. Returns False if it does not exist.
+        """
+        return self.bulk_update([(item_id, item)])[0]
+
+    def bulk_update(self, changes: list[tuple[int, Item]]) -> list[bool]:
+        """
+        Apply several (id, item) replacements at once. Returns, for each, whether the ID existed.
+        """
+        encoded = [_encode(item) for _, item in changes]
+        with self._locked():
+            # Make room first: compaction moves slots around.
+            self._reserve(0, sum(_size(name, description) for name, description in encoded))
+            found = []
+            for (item_id, item), (name, description) in zip(changes, encoded):
+                slot = self._find(item_id)
+                if slot >= 0:
+                    self._release_strings(slot)
+                    self._write(slot, item, name, description)
+                found.append(slot >= 0)
+            return found
+
+    def delete(self, item_id: int) -> Optional[Item]:
+        """
+        Remove and return the item stored under `item_id`, or None if it does not exist.
+        """
+        return self.bulk_delete([item_id])[0]
+
+    def bulk_delete(self, item_ids: list[int]) -> list[Optional[Item]]:
+        """
+        Remove several items at once, returning each removed item or None if it did not exist.
+        """
+        with self._locked():
+            removed = []
+            for item_id in item_ids:
+                slot = self._find(item_id)
+                if slot < 0:
+                    removed.append(None)
+                    continue
+                removed.append(self._read(slot))
+                self._release_strings(slot)
+                self._alive[slot] = 0
+                self._header[_LIVE] -= 1
+            if (self._header[_COUNT] - self._header[_LIVE]) * 2 > self._header[_COUNT]:
+                self._compact()
+            return removed
+
+    def items(self, after: Optional[int] = None) -> Iterator[tuple[int, Item]]:
+        """
+        Iterate over (id, item) pairs in ID order, starting after ID `after` if given.
+        """
+        for item_id, _, item in self.versioned_items(after):
+            yield item_id, item
+
+    def versioned_items(self, after: Optional[int] = None) -> Iterator[tuple[int, int, Item]]:
+        """
+        Same as items(), as (id, version, item) triples; each version is read with its item.
+        """
+        # Rows are copied out in batches so the lock is never held while the
+        # caller consumes them; each batch resumes after the last ID seen,
+        # which stays correct even if another writer compacts in between.
+        last_id = -1 if after is None else after
+        while True:
+            with self._locked():
+                slot = bisect_right(self._ids, last_id, 0, self._header[_COUNT])
+                batch = []
+                while slot < self._header[_COUNT] and len(batch) < _SCAN_BATCH:
+                    if self._alive[slot]:
+                        batch.append((self._ids[slot], self._versions[slot], self._read(slot)))
+                    slot += 1
+            if not batch:
+                return
+            yield from batch
+            last_id = batch[-1][0]
+
+    def price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, Item]]:
+        """
+        Iterate over (id, item) pairs with min_price <= price <= max_price, cheapest first.
+        Either bound may be None to leave that side open.
+        """
+        for item_id, _, item in self.versioned_price_range(min_price, max_price):
+            yield item_id, item
+
+    def versioned_price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, int, Item]]:
+        """
+        Same as price_range(), as (id, version, item) triples; each version is read with its item.
+        """
+        low = -math.inf if min_price is None else min_price
+        high = math.inf if max_price is None else max_price
+        # The price column is scanned directly; only matching rows are decoded.
+        with self._locked():
+            prices = self._prices
+            matches = sorted(
+                (prices[slot], slot)
+                for slot in range(self._header[_COUNT])
+                if self._alive[slot] and low <= prices[slot] <= high
+            )
+            rows = [(self._ids[slot], self._versions[slot], self._read(slot)) for _, slot in matches]
+        yield from rows
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return copies of the prices and taxes (NaN for None) of all items, for stats.
+        """
+        with self._locked():
+            count = self._header[_COUNT]
+            alive = np.frombuffer(self._alive, dtype=np.uint8, count=count).astype(bool)
+            prices = np.frombuffer(self._prices, count=count)[alive]
+            taxes = np.frombuffer(self._taxes, count=count)[alive]
+            return prices, taxes
+
+    def compact(self):
+        """
+        Reclaim deleted slots and orphaned strings.
+        """
+        with self._locked():
+            self._compact()
+
+    def close(self):
+        """
+        Detach this process from the segment. The data stays available to other workers.
+        """
+        for view in (
+            self._header, self._ids, self._versions, self._prices, self._taxes, self._name_offsets,
+            self._desc_offsets, self._name_lengths, self._desc_lengths, self._alive, self._arena,
+        ):
+            view.release()
+        self._shm.close()
+        self._lock_file.close()
+
+    def unlink(self):
+        """
+        Destroy the shared segment. Call once, after every worker has closed it.
+        """
+        # unlink() expects the segment to still be tracked; see _open_segment().
+        resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+    def _find(self, item_id: int) -> int:
+        count = self._header[_COUNT]
+        slot = bisect_left(self._ids, item_id, 0, count)
+        if slot < count and self._ids[slot] == item_id and self._alive[slot]:
+            return slot
+        return -1
+
+    def _read(self, slot: int) -> Item:
+        offset, length = self._name_offsets[slot], self._name_lengths[slot]
+        name = bytes(self._arena[offset : offset + length]).decode()
+        description = None
+        length = self._desc_lengths[slot]
+        if length >= 0:
+            offset = self._desc_offsets[slot]
+            description = bytes(self._arena[offset : offset + length]).decode()
+        tax = self._taxes[slot]
+        # Values were validated on the way in, so skip validating them again.
+        return Item.model_construct(
+            name=name, description=description, price=self._prices[slot], tax=None if math.isnan(tax) else tax
+        )
+
+    def _reserve(self, slots: int, nbytes: int):
+        out_of_slots = self._header[_COUNT] + slots > self._capacity
+        out_of_arena = self._header[_ARENA_USED] + nbytes > len(self._arena)
+        if not (out_of_slots or out_of_arena):
+            return
+        if self._header[_ARENA_GARBAGE] or self._header[_COUNT] > self._header[_LIVE]:
+            self._compact()
+        if self._header[_COUNT] + slots > self._capacity:
+            raise StoreFullError("No free slots left in the shared item store")
+        if self._header[_ARENA_USED] + nbytes > len(self._arena):
+            raise StoreFullError("No room left in the shared string arena")
+
+    def _write(self, slot: int, item: Item, name: bytes, description: Optional[bytes]):
+        self._name_offsets[slot] = self._append_string(name)
+        self._name_lengths[slot] = len(name)
+        if description is None:
+            self._desc_offsets[slot] = 0
+            self._desc_lengths[slot] = -1
+        else:
+            self._desc_offsets[slot] = self._append_string(description)
+            self._desc_lengths[slot] = len(description)
+        self._prices[slot] = item.price
+        self._taxes[slot] = math.nan if item.tax is None else item.tax
+        self._header[_CLOCK] += 1
+        self._versions[slot] = self._header[_CLOCK]
+
+    def _append_string(self, data: bytes) -> int:
+        offset = self._header[_ARENA_USED]
+        self._arena[offset : offset + len(data)] = data
+        self._header[_ARENA_USED] = offset + len(data)
+        return offset
+
+    def _release_strings(self, slot: int):
+        self._header[_ARENA_GARBAGE] += self._name_lengths[slot] + max(self._desc_lengths[slot], 0)
+
+    def _compact(self):
+        # Slide live slots down over dead ones (keeping ID order) and rewrite
+        # their strings contiguously into a fresh arena.
+        arena = bytearray()
+        dst = 0
+        for src in range(self._header[_COUNT]):
+            if not self._alive[src]:
+                continue
+            for offsets, lengths in ((self._name_offsets, self._name_lengths), (self._desc_offsets, self._desc_lengths)):
+                length = lengths[src]
+                if length > 0:
+                    start = offsets[src]
+                    offsets[dst] = len(arena)
+                    arena += self._arena[start : start + length]
+                else:
+                    offsets[dst] = 0
+                lengths[dst] = length
+            self._ids[dst] = self._ids[src]
+            self._versions[dst] = self._versions[src]
+            self._prices[dst] = self._prices[src]
+            self._taxes[dst] = self._taxes[src]
+            self._alive[dst] = 1
+            dst += 1
+        for slot in range(dst, self._header[_COUNT]):
+            self._alive[slot] = 0
+        self._arena[: len(arena)] = arena
+        self._header[_COUNT] = dst
+        self._header[_ARENA_USED] = len(arena)
+        self._header[_ARENA_GARBAGE] = 0
+
+
+def _encode(item: Item) -> tuple[bytes, Optional[bytes]]:
+    return item.name.encode(), None if item.description is None else item.description.encode()
+
+
+def _size(name: bytes, description: Optional[bytes]) -> int:
+    return len(name) + len(description or b"")
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    # The segment must outlive whichever worker happened to create it, so keep
+    # the resource tracker from unlinking it when that process exits.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
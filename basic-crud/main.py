@@ -1,51 +1,214 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import os
+from itertools import islice
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter, ValidationError
 from typing import List, Optional
 
+from cache import JsonCache
+from columnar import SharedColumnStore, StoreFullError
+from persistence import DurableStore, LogWriteError
+from schemas import BulkResult, Item, ItemStats, StoredItem
+from stats import summarize
+from store import ItemStore
+
 # Initialize FastAPI app
 app = FastAPI()
 
-# Define the data model for an Item using Pydantic
-class Item(BaseModel):
-    name: str
-    description: Optional[str] = None
-    price: float
-    tax: Optional[float] = None
+# In-memory database, keyed by stable item IDs.
+# STORE_BACKEND=memory (default) keeps items in this process (see store.py).
+# STORE_BACKEND=shared packs them into a shared memory segment that every
+# uvicorn worker opening the same SHARED_STORE_NAME sees (see columnar.py).
+if os.getenv("STORE_BACKEND", "memory") == "shared":
+    store = SharedColumnStore(
+        name=os.getenv("SHARED_STORE_NAME", "basic-crud-items"),
+        capacity=int(os.getenv("SHARED_STORE_CAPACITY", "100000")),
+        arena_size=int(os.getenv("SHARED_STORE_ARENA_BYTES", str(64 * 1024 * 1024))),
+    )
+else:
+    store = ItemStore()
+
+# Setting DATA_DIR makes the in-process store durable: writes go to a
+# write-ahead log in that directory, and a snapshot plus the log are
+# reloaded on startup (see persistence.py).
+if os.getenv("DATA_DIR"):
+    if not isinstance(store, ItemStore):
+        raise RuntimeError("DATA_DIR is only supported with STORE_BACKEND=memory")
+    store = DurableStore(
+        store,
+        os.environ["DATA_DIR"],
+        commit_interval=float(os.getenv("WAL_COMMIT_INTERVAL_MS", "2")) / 1000,
+        snapshot_interval=float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "60")),
+    )
+
+
+# Encoded JSON per item, reused until the item changes (see cache.py)
+json_cache = JsonCache(store, max_entries=int(os.getenv("JSON_CACHE_SIZE", "100000")))
+
+
+@app.on_event("shutdown")
+def close_store():
+    # Flush the write-ahead log, or detach from the shared segment
+    if isinstance(store, (DurableStore, SharedColumnStore)):
+        store.close()
+
+
+# The shared segment has a fixed size; report running out of it as 507 Insufficient Storage
+@app.exception_handler(StoreFullError)
+async def store_full_handler(_request: Request, exc: StoreFullError):
+    return JSONResponse(status_code=507, content={"detail": str(exc)})
+
+# A write the write-ahead log could not make durable fails instead of waiting forever
+@app.exception_handler(LogWriteError)
+async def log_write_error_handler(_request: Request, exc: LogWriteError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
-# In-memory database (list of Item objects)
-db = []
+# Attach the store ID to an item for the response
+def _with_id(item_id: int, item: Item) -> StoredItem:
+    return StoredItem(id=item_id, **item.model_dump())
 
 # --- CRUD Operations ---
 
-# Create operation: Add a new item
-@app.post("/items/", response_model=Item)
+# Create operation: Add a new item and return it with its assigned ID
+@app.post("/items/", response_model=StoredItem)
 def create_item(item: Item):
-    db.append(item)
-    return item
+    item_id = store.create(item)
+    return _with_id(item_id, item)
+
+# Read all items operation, optionally restricted to a price range.
+# Results are paged with ?limit=; when a page is full, the X-Next-Cursor
+# header holds the value to pass as ?after= to fetch the next one.
+# Clients sending "Accept: application/x-ndjson" get one item per line,
+# streamed straight from the store as it is read. With ?limit=, the page is
+# read before streaming starts so that X-Next-Cursor can be sent with it.
+# The body is assembled from cached JSON fragments and returned as-is,
+# without going through response_model validation again.
+@app.get("/items/", response_model=List[StoredItem])
+def read_items(
+    request: Request,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    after: Optional[int] = Query(None, ge=-1),
+    limit: Optional[int] = Query(None, ge=1),
+):
+    if min_price is None and max_price is None:
+        rows = store.versioned_items(after)
+    elif after is not None:
+        raise HTTPException(status_code=400, detail="after cannot be combined with a price range")
+    else:
+        rows = store.versioned_price_range(min_price, max_price)
+    if limit is not None:
+        rows = islice(rows, limit)
+    fragments = json_cache.fragments(rows)
+
+    ndjson = "application/x-ndjson" in request.headers.get("accept", "")
+    if ndjson and limit is None:
+        return StreamingResponse(_ndjson_chunks(fragments), media_type="application/x-ndjson")
+
+    page = list(fragments)
+    headers = {}
+    if limit is not None and len(page) == limit and min_price is None and max_price is None:
+        headers["X-Next-Cursor"] = str(page[-1][0])
+    if ndjson:
+        return StreamingResponse(_ndjson_chunks(iter(page)), media_type="application/x-ndjson", headers=headers)
+    return Response(b"[" + b",".join(data for _, data in page) + b"]", media_type="application/json", headers=headers)
+
+# Join JSON fragments into NDJSON, a few hundred lines per chunk
+def _ndjson_chunks(fragments, chunk_size: int = 256):
+    while True:
+        chunk = [data for _, data in islice(fragments, chunk_size)]
+        if not chunk:
+            return
+        yield b"\n".join(chunk) + b"\n"
+
+# --- Bulk Operations ---
+# Each bulk body is validated in a single pass straight from the raw JSON
+# bytes, then applied to the store as one batch under one lock.
+
+item_list = TypeAdapter(List[Item])
+stored_item_list = TypeAdapter(List[StoredItem])
+id_list = TypeAdapter(List[int])
+
+async def _validate_body(request: Request, adapter: TypeAdapter):
+    try:
+        return adapter.validate_json(await request.body())
+    except ValidationError as e:
+        # Report error locations relative to the body, as FastAPI does
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)])
+
+# Bulk create: a JSON array of items; all of them are stored or none are
+@app.post("/items/bulk", response_model=List[BulkResult])
+async def bulk_create_items(request: Request):
+    items = await _validate_body(request, item_list)
+    item_ids = await run_in_threadpool(store.bulk_create, items)
+    return [BulkResult(id=item_id, status="created") for item_id in item_ids]
+
+# Bulk update: a JSON array of items, each with the id it replaces
+@app.put("/items/bulk", response_model=List[BulkResult])
+async def bulk_update_items(request: Request):
+    items = await _validate_body(request, stored_item_list)
+    changes = [(item.id, Item.model_construct(**item.model_dump(exclude={"id"}))) for item in items]
+    found = await run_in_threadpool(store.bulk_update, changes)
+    for item_id, _ in changes:
+        json_cache.invalidate(item_id)
+    return [
+        BulkResult(id=item_id, status="updated" if ok else "not_found")
+        for (item_id, _), ok in zip(changes, found)
+    ]
+
+# Bulk delete: a JSON array of item IDs
+@app.delete("/items/bulk", response_model=List[BulkResult])
+async def bulk_delete_items(request: Request):
+    item_ids = await _validate_body(request, id_list)
+    removed = await run_in_threadpool(store.bulk_delete, item_ids)
+    for item_id in item_ids:
+        json_cache.invalidate(item_id)
+    return [
+        BulkResult(id=item_id, status="deleted" if item is not None else "not_found")
+        for item_id, item in zip(item_ids, removed)
+    ]
 
-# Read all items operation
-@app.get("/items/", response_model=List[Item])
-def read_items():
-    return db
+# Aggregate statistics over all items: count, price totals, mean, min/max,
+# percentiles (?percentiles=50,90,99) and tax-inclusive totals. With
+# ?bucket_width=, also a breakdown by price bucket.
+@app.get("/items/stats", response_model=ItemStats)
+def read_item_stats(percentiles: str = "50,90,99", bucket_width: Optional[float] = Query(None, gt=0)):
+    try:
+        points = [float(p) for p in percentiles.split(",") if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="percentiles must be a comma-separated list of numbers")
+    if any(not 0 <= p <= 100 for p in points):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+    prices, taxes = store.columns()
+    try:
+        return summarize(prices, taxes, points, bucket_width)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-# Read a single item by its ID (index in the list)
-@app.get("/items/{item_id}", response_model=Item)
+# Read a single item by its ID, served from the JSON cache
+@app.get("/items/{item_id}", response_model=StoredItem)
 def read_item(item_id: int):
-    if item_id < 0 or item_id >= len(db):
+    data = json_cache.get(item_id)
+    if data is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return db[item_id]
+    return Response(data, media_type="application/json")
 
 # Update operation: Modify an existing item by its ID
-@app.put("/items/{item_id}", response_model=Item)
+@app.put("/items/{item_id}", response_model=StoredItem)
 def update_item(item_id: int, item: Item):
-    if item_id < 0 or item_id >= len(db):
+    if not store.update(item_id, item):
         raise HTTPException(status_code=404, detail="Item not found")
-    db[item_id] = item
-    return item
+    json_cache.invalidate(item_id)
+    return _with_id(item_id, item)
 
 # Delete operation: Remove an item by its ID
-@app.delete("/items/{item_id}", response_model=Item)
+@app.delete("/items/{item_id}", response_model=StoredItem)
 def delete_item(item_id: int):
-    if item_id < 0 or item_id >= len(db):
+    item = store.delete(item_id)
+    if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
-    return db.pop(item_id)
+    json_cache.invalidate(item_id)
+    return _with_id(item_id, item)
@@ -0,0 +1,391 @@
+"""
+Durability for the in-memory item store: a write-ahead log plus snapshots.
+
+Every create, update and delete is appended to the log as a compact binary
+record before the request returns. Records are not fsynced one by one: a
+flusher thread writes whatever has piled up every few milliseconds and
+fsyncs it once (group commit), and each writer waits only until the batch
+holding its record is on disk.
+
+The log is split into numbered segment files. A background compactor
+periodically starts a new segment, writes every live item to a snapshot
+file, and deletes the segments the snapshot has made redundant. At startup
+the snapshot is read through `mmap` and only the segments written after it
+are replayed.
+
+Record layout (little-endian):
+
+    crc32 (u32) | op (u8) | item id (i64) | payload length (u32) | payload
+
+where the payload of a create or update is a packed item:
+
+    price (f64) | tax (f64, NaN for None) | name length (i32) | name |
+    description length (i32, -1 for None) | description
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, Optional
+
+import numpy as np
+
+from schemas import Item
+from store import ItemStore
+
+_CREATE, _UPDATE, _DELETE = 1, 2, 3
+
+_RECORD_HEADER = struct.Struct("<IBqI")
+_ITEM_FIXED = struct.Struct("<ddi")
+_LENGTH = struct.Struct("<i")
+_SNAPSHOT_HEADER = struct.Struct("<8sqqq")  # magic, next_id, item count, first WAL segment to replay
+_SNAPSHOT_ID = struct.Struct("<q")
+_SNAPSHOT_MAGIC = b"BCSNAP01"
+_SNAPSHOT_FILE = "snapshot.bin"
+
+
+class LogWriteError(Exception):
+    """
+    Raised to writers once the write-ahead log could not be written or fsynced.
+    """
+
+
+def _segment_name(number: int) -> str:
+    return f"wal-{number:08d}.log"
+
+
+def _pack_item(item: Item) -> bytes:
+    name = item.name.encode()
+    tax = float("nan") if item.tax is None else item.tax
+    parts = [_ITEM_FIXED.pack(item.price, tax, len(name)), name]
+    if item.description is None:
+        parts.append(_LENGTH.pack(-1))
+    else:
+        description = item.description.encode()
+        parts += [_LENGTH.pack(len(description)), description]
+    return b"".join(parts)
+
+
+def _unpack_item(buf, offset: int) -> tuple[Item, int]:
+    price, tax, length = _ITEM_FIXED.unpack_from(buf, offset)
+    offset += _ITEM_FIXED.size
+    name = bytes(buf[offset : offset + length]).decode()
+    offset += length
+    (length,) = _LENGTH.unpack_from(buf, offset)
+    offset += _LENGTH.size
+    description = None
+    if length >= 0:
+        description = bytes(buf[offset : offset + length]).decode()
+        offset += length
+    # Everything on disk was validated before it was written.
+    item = Item.model_construct(name=name, description=description, price=price, tax=None if tax != tax else tax)
+    return item, offset
+
+
+def _pack_record(op: int, item_id: int, item: Optional[Item] = None) -> bytes:
+    payload = b"" if item is None else _pack_item(item)
+    body = _RECORD_HEADER.pack(0, op, item_id, len(payload))[4:] + payload
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def _read_records(buf) -> Iterator[tuple[int, int, Optional[Item]]]:
+    """
+    Yield (op, item id, item) for every intact record, stopping at the first
+    torn or corrupt one (a crash in the middle of a write).
+    """
+    offset = 0
+    while offset + _RECORD_HEADER.size <= len(buf):
+        crc, op, item_id, length = _RECORD_HEADER.unpack_from(buf, offset)
+        end = offset + _RECORD_HEADER.size + length
+        if end > len(buf) or zlib.crc32(buf[offset + 4 : end]) != crc:
+            return
+        item = None
+        if op != _DELETE:
+            item, _ = _unpack_item(buf, offset + _RECORD_HEADER.size)
+        yield op, item_id, item
+        offset = end
+
+
+def _fsync_dir(directory: str):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """
+    Append-only log with group commit.
+
+    `append()` only copies the record into a buffer; a flusher thread writes
+    and fsyncs the buffer every `commit_interval` seconds, and `wait()` blocks
+    until the batch holding a given record is durable.
+
+    If a write or fsync fails, the log stops: what reached the file is no
+    longer known to be intact, so `wait()` raises LogWriteError for every
+    record not already durable instead of blocking forever.
+    """
+
+    def __init__(self, directory: str, segment: int, commit_interval: float = 0.002):
+        self.directory = directory
+        self.segment = segment
+        self._file = open(os.path.join(directory, _segment_name(segment)), "ab")
+        self._commit_interval = commit_interval
+        self._buffer = bytearray()
+        self._appended = 0
+        self._durable = 0
+        self._closed = False
+        self._error: Optional[OSError] = None
+        # _io_lock is held while bytes go to disk; _cond guards the buffer and
+        # counters. When both are needed, _io_lock is taken first.
+        self._io_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._flusher = threading.Thread(target=self._flush_loop, name="wal-flusher", daemon=True)
+        self._flusher.start()
+
+    def append(self, record: bytes) -> int:
+        """
+        Queue a record and return its sequence number.
+        """
+        with self._cond:
+            self._buffer += record
+            self._appended += 1
+            self._cond.notify_all()
+            return self._appended
+
+    def wait(self, seq: int):
+        """
+        Block until the record with sequence number `seq` has been fsynced.
+        """
+        with self._cond:
+            while self._durable < seq:
+                if self._error is not None:
+                    raise LogWriteError(f"Write-ahead log failed: {self._error}") from self._error
+                self._cond.wait()
+
+    def rotate(self) -> int:
+        """
+        Flush what is buffered, then continue in a new segment. Returns the new segment number.
+        """
+        with self._io_lock, self._cond:
+            if self._error is not None:
+                raise LogWriteError(f"Write-ahead log failed: {self._error}") from self._error
+            self._write_out(bytes(self._buffer), self._appended)
+            self._buffer.clear()
+            self._file.close()
+            self.segment += 1
+            self._file = open(os.path.join(self.directory, _segment_name(self.segment)), "ab")
+            _fsync_dir(self.directory)
+            return self.segment
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self._file.close()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._buffer:
+                    return
+            # Give concurrent writers a moment to join this batch.
+            time.sleep(self._commit_interval)
+            with self._io_lock:
+                with self._cond:
+                    data, seq = bytes(self._buffer), self._appended
+                    self._buffer.clear()
+                try:
+                    self._write_out(data, seq)
+                except OSError:
+                    return
+
+    def _write_out(self, data: bytes, seq: int):
+        try:
+            if data:
+                self._file.write(data)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        except OSError as e:
+            # Wake every waiter so that it raises, rather than waiting for a flush that never comes.
+            with self._cond:
+                self._error = e
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._durable = max(self._durable, seq)
+            self._cond.notify_all()
+
+
+class DurableStore:
+    """
+    An `ItemStore` whose writes are logged to `directory` and reloaded on startup.
+    """
+
+    def __init__(
+        self,
+        store: ItemStore,
+        directory: str,
+        commit_interval: float = 0.002,
+        snapshot_interval: float = 60.0,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self._store = store
+        self._directory = directory
+        last_segment = self._recover()
+        self._wal = WriteAheadLog(directory, last_segment + 1, commit_interval)
+        self._writes_since_snapshot = 0
+        # Keeps the order of records in the log identical to the order in
+        # which writes were applied to the store.
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._snapshot_interval = snapshot_interval
+        self._compactor = threading.Thread(target=self._compact_loop, name="wal-compactor", daemon=True)
+        self._compactor.start()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def create(self, item: Item) -> int:
+        return self.bulk_create([item])[0]
+
+    def bulk_create(self, items: list[Item]) -> list[int]:
+        with self._lock:
+            item_ids = self._store.bulk_create(items)
+            seq = self._log([_pack_record(_CREATE, item_id, item) for item_id, item in zip(item_ids, items)])
+        self._wal.wait(seq)
+        return item_ids
+
+    def get(self, item_id: int) -> Optional[Item]:
+        return self._store.get(item_id)
+
+    def version(self, item_id: int) -> Optional[int]:
+        return self._store.version(item_id)
+
+    def update(self, item_id: int, item: Item) -> bool:
+        return self.bulk_update([(item_id, item)])[0]
+
+    def bulk_update(self, changes: list[tuple[int, Item]]) -> list[bool]:
+        with self._lock:
+            found = self._store.bulk_update(changes)
+            seq = self._log(
+                [_pack_record(_UPDATE, item_id, item) for (item_id, item), ok in zip(changes, found) if ok]
+            )
+        self._wal.wait(seq)
+        return found
+
+    def delete(self, item_id: int) -> Optional[Item]:
+        return self.bulk_delete([item_id])[0]
+
+    def bulk_delete(self, item_ids: list[int]) -> list[Optional[Item]]:
+        with self._lock:
+            removed = self._store.bulk_delete(item_ids)
+            seq = self._log(
+                [_pack_record(_DELETE, item_id) for item_id, item in zip(item_ids, removed) if item is not None]
+            )
+        self._wal.wait(seq)
+        return removed
+
+    def items(self, after: Optional[int] = None) -> Iterator[tuple[int, Item]]:
+        return self._store.items(after)
+
+    def versioned_items(self, after: Optional[int] = None) -> Iterator[tuple[int, int, Item]]:
+        return self._store.versioned_items(after)
+
+    def price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, Item]]:
+        return self._store.price_range(min_price, max_price)
+
+    def versioned_price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, int, Item]]:
+        return self._store.versioned_price_range(min_price, max_price)
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray]:
+        return self._store.columns()
+
+    def snapshot(self):
+        """
+        Write every live item to the snapshot file and drop the log segments it covers.
+        """
+        with self._lock:
+            first_segment = self._wal.rotate()
+            state = self._store.snapshot()
+            self._writes_since_snapshot = 0
+        # The store snapshot is immutable, so writers are free to continue
+        # into the new segment while it is written out.
+        path = os.path.join(self._directory, _SNAPSHOT_FILE)
+        with open(path + ".tmp", "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, state.next_id, len(state), first_segment))
+            for item_id, item in state.items():
+                f.write(_SNAPSHOT_ID.pack(item_id))
+                f.write(_pack_item(item))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_dir(self._directory)
+        for segment in self._segments():
+            if segment < first_segment:
+                os.remove(os.path.join(self._directory, _segment_name(segment)))
+
+    def close(self):
+        """
+        Stop the compactor and flush the log. Call on shutdown.
+        """
+        self._stop.set()
+        self._compactor.join()
+        self._wal.close()
+
+    def _log(self, records: list[bytes]) -> int:
+        # A whole batch goes into the log as one append, so it is made durable together.
+        self._writes_since_snapshot += len(records)
+        return self._wal.append(b"".join(records)) if records else 0
+
+    def _compact_loop(self):
+        while not self._stop.wait(self._snapshot_interval):
+            if self._writes_since_snapshot:
+                self.snapshot()
+
+    def _segments(self) -> list[int]:
+        return sorted(
+            int(name[4:12]) for name in os.listdir(self._directory) if name.startswith("wal-") and name.endswith(".log")
+        )
+
+    def _recover(self) -> int:
+        """
+        Load the snapshot and replay the log after it. Returns the last segment number seen.
+        """
+        first_segment = 0
+        path = os.path.join(self._directory, _SNAPSHOT_FILE)
+        # Everything is reloaded in one batch, published once at the end.
+        with self._store.batch() as batch:
+            if os.path.exists(path) and os.path.getsize(path) >= _SNAPSHOT_HEADER.size:
+                with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                    magic, next_id, count, first_segment = _SNAPSHOT_HEADER.unpack_from(buf)
+                    if magic != _SNAPSHOT_MAGIC:
+                        raise RuntimeError(f"{path} is not a basic-crud snapshot")
+                    offset = _SNAPSHOT_HEADER.size
+                    for _ in range(count):
+                        (item_id,) = _SNAPSHOT_ID.unpack_from(buf, offset)
+                        item, offset = _unpack_item(buf, offset + _SNAPSHOT_ID.size)
+                        batch.put(item_id, item)
+                    batch.reserve_ids(next_id)
+
+            segments = [segment for segment in self._segments() if segment >= first_segment]
+            for segment in segments:
+                with open(os.path.join(self._directory, _segment_name(segment)), "rb") as f:
+                    data = f.read()
+                for op, item_id, item in _read_records(data):
+                    if op == _DELETE:
+                        batch.delete(item_id)
+                    else:
+                        batch.put(item_id, item)
+        return segments[-1] if segments else first_segment - 1
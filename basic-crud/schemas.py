@@ -0,0 +1,41 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, List, Optional
+
+# Define the data model for an Item using Pydantic.
+# Items are immutable: the store shares them between snapshots instead of copying them.
+class Item(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    description: Optional[str] = None
+    price: float
+    tax: Optional[float] = None
+
+# An Item as returned by the API, together with its stable ID in the store
+class StoredItem(Item):
+    id: int
+
+# Outcome of one entry in a bulk request: "created", "updated", "deleted" or "not_found"
+class BulkResult(BaseModel):
+    id: int
+    status: str
+
+# Totals for the items whose price falls in [min_price, max_price)
+class PriceBucket(BaseModel):
+    min_price: float
+    max_price: float
+    count: int
+    total_price: float
+    total_with_tax: float
+
+# Aggregates over all stored items; tax is an amount added to the price
+class ItemStats(BaseModel):
+    count: int
+    total_price: float
+    mean_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    percentiles: Dict[str, float] = {}
+    total_tax: float
+    total_with_tax: float
+    buckets: Optional[List[PriceBucket]] = None
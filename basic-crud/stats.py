@@ -0,0 +1,71 @@
+"""
+Vectorized aggregates over item prices and taxes.
+
+Stores hand over every item's price and tax as dense float64 arrays (a
+missing tax is NaN). The in-process store builds them per chunk of items and
+reuses them until that chunk changes; the shared store reads them straight
+from its columns. `summarize()` then answers count/sum/mean/min/max,
+percentiles, tax-inclusive totals and a per-bucket breakdown with a handful
+of NumPy calls, instead of a Python loop over every item.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+from schemas import ItemStats, PriceBucket
+
+# Upper bound on the number of buckets one stats request may produce.
+MAX_BUCKETS = 10_000
+
+
+def summarize(
+    prices: np.ndarray,
+    taxes: np.ndarray,
+    percentiles: Sequence[float] = (50, 90, 99),
+    bucket_width: Optional[float] = None,
+) -> ItemStats:
+    """
+    Aggregate price/tax columns. With `bucket_width`, also break them down
+    into price buckets [k * width, (k + 1) * width).
+    """
+    count = len(prices)
+    tax_amounts = np.nan_to_num(taxes)
+    total_price = float(prices.sum())
+    total_tax = float(tax_amounts.sum())
+    stats = ItemStats(
+        count=count,
+        total_price=total_price,
+        total_tax=total_tax,
+        total_with_tax=total_price + total_tax,
+    )
+    if count == 0:
+        return stats
+
+    stats.mean_price = total_price / count
+    stats.min_price = float(prices.min())
+    stats.max_price = float(prices.max())
+    if percentiles:
+        values = np.percentile(prices, percentiles)
+        stats.percentiles = {f"{p:g}": float(v) for p, v in zip(percentiles, values)}
+
+    if bucket_width is not None:
+        keys = np.floor(prices / bucket_width).astype(np.int64)
+        first = int(keys.min())
+        if int(keys.max()) - first >= MAX_BUCKETS:
+            raise ValueError(f"bucket_width is too small: more than {MAX_BUCKETS} buckets")
+        index = keys - first
+        counts = np.bincount(index)
+        price_sums = np.bincount(index, weights=prices)
+        tax_sums = np.bincount(index, weights=tax_amounts)
+        stats.buckets = [
+            PriceBucket(
+                min_price=(first + k) * bucket_width,
+                max_price=(first + k + 1) * bucket_width,
+                count=int(counts[k]),
+                total_price=float(price_sums[k]),
+                total_with_tax=float(price_sums[k] + tax_sums[k]),
+            )
+            for k in range(len(counts))
+        ]
+    return stats
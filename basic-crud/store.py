@@ -0,0 +1,356 @@
+"""
+In-memory storage engine for the basic CRUD example.
+
+Items are keyed by a monotonically assigned ID, so lookups, updates and
+deletes by ID are cheap and an ID is never renumbered or reused once it has
+been handed out. A sorted (price, id) index serves price range queries with
+a binary search.
+
+Readers never take a lock. All data is reachable from one immutable
+`Snapshot`; a reader picks up the current one with a single attribute read
+and sees a consistent state for as long as it holds on to it. Writers are
+serialized and copy-on-write: they copy only the pieces they touch, then
+publish a new snapshot by swapping that one reference. To keep those copies
+small, items are split by ID into chunks of 1024 and the price index into
+blocks of at most 1024 entries.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import numpy as np
+
+from schemas import Item
+
+_CHUNK_BITS = 10  # 1024 IDs per chunk
+_BLOCK_SIZE = 512  # price index blocks are split in two beyond twice this
+
+
+class _Chunk:
+    """
+    The items whose IDs fall in one 1024-wide range, as {id: (version, item)}
+    in ID order. Never modified once published.
+    """
+
+    __slots__ = ("rows", "_columns")
+
+    def __init__(self, rows: dict[int, tuple[int, Item]]):
+        self.rows = rows
+        self._columns = None
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray]:
+        # Computed on first use and kept, since the chunk can no longer change.
+        if self._columns is None:
+            items = [item for _, item in self.rows.values()]
+            prices = np.fromiter((item.price for item in items), float, len(items))
+            taxes = np.fromiter((np.nan if item.tax is None else item.tax for item in items), float, len(items))
+            self._columns = (prices, taxes)
+        return self._columns
+
+
+class Snapshot:
+    """
+    An immutable, consistent view of the whole store.
+    """
+
+    def __init__(self, chunks: list, blocks: list, firsts: list, count: int, next_id: int, clock: int):
+        self._chunks = chunks  # chunk i holds IDs [i * 1024, (i + 1) * 1024)
+        self._blocks = blocks  # price index: sorted blocks of (price, id)
+        self._firsts = firsts  # first entry of each block, to find a block by bisection
+        self._count = count
+        self.next_id = next_id
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, item_id: int) -> Optional[Item]:
+        row = self._row(item_id)
+        return None if row is None else row[1]
+
+    def version(self, item_id: int) -> Optional[int]:
+        row = self._row(item_id)
+        return None if row is None else row[0]
+
+    def items(self, after: Optional[int] = None) -> Iterator[tuple[int, Item]]:
+        for item_id, _, item in self.versioned_items(after):
+            yield item_id, item
+
+    def versioned_items(self, after: Optional[int] = None) -> Iterator[tuple[int, int, Item]]:
+        # IDs are never negative, so any `after` below 0 starts at the first chunk.
+        start = 0 if after is None else max(after + 1, 0) >> _CHUNK_BITS
+        for chunk in self._chunks[start:]:
+            for item_id, (version, item) in chunk.rows.items():
+                if after is None or item_id > after:
+                    yield item_id, version, item
+
+    def price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, Item]]:
+        for item_id, _, item in self.versioned_price_range(min_price, max_price):
+            yield item_id, item
+
+    def versioned_price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, int, Item]]:
+        start = 0 if min_price is None else max(bisect_left(self._firsts, (min_price, -1)) - 1, 0)
+        for block in self._blocks[start:]:
+            pos = 0 if min_price is None else bisect_left(block, (min_price, -1))
+            for price, item_id in block[pos:]:
+                if max_price is not None and price > max_price:
+                    return
+                version, item = self._row(item_id)
+                yield item_id, version, item
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray]:
+        parts = [chunk.columns() for chunk in self._chunks if chunk.rows]
+        if not parts:
+            return np.empty(0), np.empty(0)
+        return np.concatenate([p for p, _ in parts]), np.concatenate([t for _, t in parts])
+
+    def _row(self, item_id: int) -> Optional[tuple[int, Item]]:
+        index = item_id >> _CHUNK_BITS
+        if 0 <= index < len(self._chunks):
+            return self._chunks[index].rows.get(item_id)
+        return None
+
+
+class Batch:
+    """
+    Writes staged against a snapshot, published together by `ItemStore.batch()`.
+
+    Chunks and index blocks are copied the first time the batch touches
+    them; the copies are private to the batch and are changed in place.
+    """
+
+    def __init__(self, base: Snapshot):
+        self._chunks = list(base._chunks)
+        self._blocks = list(base._blocks)
+        self._firsts = list(base._firsts)
+        self._count = len(base)
+        self._next_id = base.next_id
+        self._clock = base._clock
+        self._owned: set[int] = set()
+
+    def create(self, item: Item) -> int:
+        item_id = self._next_id
+        self.put(item_id, item)
+        return item_id
+
+    def put(self, item_id: int, item: Item):
+        """
+        Store `item` under `item_id`, whether or not that ID exists. New IDs
+        must be put in ascending order. Used directly when reloading from disk.
+        """
+        rows = self._rows(item_id)
+        old = rows.get(item_id)
+        self._clock += 1
+        rows[item_id] = (self._clock, item)
+        if old is None:
+            self._count += 1
+            self._index_add((item.price, item_id))
+        elif old[1].price != item.price:
+            self._index_remove((old[1].price, item_id))
+            self._index_add((item.price, item_id))
+        self._next_id = max(self._next_id, item_id + 1)
+
+    def update(self, item_id: int, item: Item) -> bool:
+        if self.get(item_id) is None:
+            return False
+        self.put(item_id, item)
+        return True
+
+    def delete(self, item_id: int) -> Optional[Item]:
+        item = self.get(item_id)
+        if item is not None:
+            del self._rows(item_id)[item_id]
+            self._count -= 1
+            self._index_remove((item.price, item_id))
+        return item
+
+    def get(self, item_id: int) -> Optional[Item]:
+        index = item_id >> _CHUNK_BITS
+        if 0 <= index < len(self._chunks):
+            row = self._chunks[index].rows.get(item_id)
+            return None if row is None else row[1]
+        return None
+
+    def reserve_ids(self, next_id: int):
+        """
+        Make sure IDs below `next_id` are never handed out again.
+        """
+        self._next_id = max(self._next_id, next_id)
+
+    def publish(self) -> Snapshot:
+        return Snapshot(self._chunks, self._blocks, self._firsts, self._count, self._next_id, self._clock)
+
+    def _rows(self, item_id: int) -> dict[int, tuple[int, Item]]:
+        index = item_id >> _CHUNK_BITS
+        while len(self._chunks) <= index:
+            self._chunks.append(self._own(_Chunk({})))
+        chunk = self._chunks[index]
+        if id(chunk) not in self._owned:
+            chunk = self._chunks[index] = self._own(_Chunk(dict(chunk.rows)))
+        return chunk.rows
+
+    def _block(self, index: int) -> list:
+        block = self._blocks[index]
+        if id(block) not in self._owned:
+            block = self._blocks[index] = self._own(list(block))
+        return block
+
+    def _own(self, obj):
+        # Objects created by this batch are alive until it is published, so
+        # their ids cannot collide with those of published objects.
+        self._owned.add(id(obj))
+        return obj
+
+    def _index_add(self, entry: tuple[float, int]):
+        if not self._blocks:
+            self._blocks.append(self._own([entry]))
+            self._firsts.append(entry)
+            return
+        index = max(bisect_right(self._firsts, entry) - 1, 0)
+        block = self._block(index)
+        insort(block, entry)
+        self._firsts[index] = block[0]
+        if len(block) > 2 * _BLOCK_SIZE:
+            head, tail = self._own(block[:_BLOCK_SIZE]), self._own(block[_BLOCK_SIZE:])
+            self._blocks[index : index + 1] = [head, tail]
+            self._firsts[index : index + 1] = [head[0], tail[0]]
+
+    def _index_remove(self, entry: tuple[float, int]):
+        index = bisect_right(self._firsts, entry) - 1
+        block = self._block(index)
+        del block[bisect_left(block, entry)]
+        if block:
+            self._firsts[index] = block[0]
+        else:
+            del self._blocks[index], self._firsts[index]
+
+
+class ItemStore:
+    def __init__(self):
+        self._current = Snapshot([], [], [], 0, 0, 0)
+        # Serializes writers only; readers just load self._current.
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    @property
+    def next_id(self) -> int:
+        """
+        The ID the next created item will get.
+        """
+        return self._current.next_id
+
+    def snapshot(self) -> Snapshot:
+        """
+        Return the current state of the store. It never changes afterwards.
+        """
+        return self._current
+
+    @contextmanager
+    def batch(self) -> Iterator[Batch]:
+        """
+        Stage several writes and make them visible to readers all at once.
+        Nothing is published if the block raises.
+        """
+        with self._lock:
+            batch = Batch(self._current)
+            yield batch
+            self._current = batch.publish()
+
+    def create(self, item: Item) -> int:
+        """
+        Store a new item and return the ID assigned to it.
+        """
+        with self.batch() as batch:
+            return batch.create(item)
+
+    def bulk_create(self, items: list[Item]) -> list[int]:
+        """
+        Store several items at once and return their IDs, in order.
+        """
+        with self.batch() as batch:
+            return [batch.create(item) for item in items]
+
+    def get(self, item_id: int) -> Optional[Item]:
+        """
+        Return the item stored under `item_id`, or None if there is none.
+        """
+        return self._current.get(item_id)
+
+    def version(self, item_id: int) -> Optional[int]:
+        """
+        Return the current version of the item stored under `item_id`, or None if there is none.
+        A version read before `get()` is never newer than the item `get()` returns.
+        """
+        return self._current.version(item_id)
+
+    def update(self, item_id: int, item: Item) -> bool:
+        """
+        Replace the item stored under `item_id`. Returns False if it does not exist.
+        """
+        with self.batch() as batch:
+            return batch.update(item_id, item)
+
+    def bulk_update(self, changes: list[tuple[int, Item]]) -> list[bool]:
+        """
+        Apply several (id, item) replacements at once. Returns, for each, whether the ID existed.
+        """
+        with self.batch() as batch:
+            return [batch.update(item_id, item) for item_id, item in changes]
+
+    def delete(self, item_id: int) -> Optional[Item]:
+        """
+        Remove and return the item stored under `item_id`, or None if it does not exist.
+        """
+        with self.batch() as batch:
+            return batch.delete(item_id)
+
+    def bulk_delete(self, item_ids: list[int]) -> list[Optional[Item]]:
+        """
+        Remove several items at once, returning each removed item or None if it did not exist.
+        """
+        with self.batch() as batch:
+            return [batch.delete(item_id) for item_id in item_ids]
+
+    def items(self, after: Optional[int] = None) -> Iterator[tuple[int, Item]]:
+        """
+        Iterate over (id, item) pairs in ID order, starting after ID `after` if given.
+        The whole iteration reads the snapshot that was current when it was started.
+        """
+        return self._current.items(after)
+
+    def versioned_items(self, after: Optional[int] = None) -> Iterator[tuple[int, int, Item]]:
+        """
+        Same as items(), as (id, version, item) triples read from the same snapshot.
+        """
+        return self._current.versioned_items(after)
+
+    def price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, Item]]:
+        """
+        Iterate over (id, item) pairs with min_price <= price <= max_price, cheapest first.
+        Either bound may be None to leave that side open.
+        """
+        return self._current.price_range(min_price, max_price)
+
+    def versioned_price_range(
+        self, min_price: Optional[float] = None, max_price: Optional[float] = None
+    ) -> Iterator[tuple[int, int, Item]]:
+        """
+        Same as price_range(), as (id, version, item) triples read from the same snapshot.
+        """
+        return self._current.versioned_price_range(min_price, max_price)
+
+    def columns(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the prices and taxes (NaN for None) of all items, for stats.
+        """
+        return self._current.columns()
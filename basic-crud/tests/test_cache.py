@@ -0,0 +1,41 @@
+import json
+
+from cache import JsonCache
+from schemas import Item
+from store import ItemStore
+
+
+class NoLookups:
+    """
+    Wraps a store, failing the test if the cache reads items back from it one by one.
+    """
+
+    def __init__(self, store: ItemStore):
+        self._store = store
+
+    def __getattr__(self, name):
+        if name in ("get", "version"):
+            raise AssertionError(f"listing called store.{name}()")
+        return getattr(self._store, name)
+
+
+def test_listing_is_encoded_from_its_own_snapshot():
+    store = ItemStore()
+    store.bulk_create([Item(name=f"item {i}", price=float(i)) for i in range(1, 11)])
+    cache = JsonCache(NoLookups(store))
+    rows = store.versioned_price_range(3, 5)
+    # Moving an item out of the range after the listing started does not leak into it.
+    store.update(4, Item(name="item 4", price=50.0))
+    prices = [json.loads(data)["price"] for _, data in cache.fragments(rows)]
+    assert prices == [3.0, 4.0, 5.0]
+
+
+def test_listing_reuses_and_refreshes_entries():
+    store = ItemStore()
+    (item_id,) = store.bulk_create([Item(name="old", price=1.0)])
+    cache = JsonCache(store)
+    first = dict(cache.fragments(store.versioned_items()))[item_id]
+    assert dict(cache.fragments(store.versioned_items()))[item_id] is first
+    store.update(item_id, Item(name="new", price=1.0))
+    assert json.loads(dict(cache.fragments(store.versioned_items()))[item_id])["name"] == "new"
+    assert json.loads(cache.get(item_id))["name"] == "new"
@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from cache import JsonCache
+from schemas import StoredItem
+from store import ItemStore
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = ItemStore()
+    monkeypatch.setattr(main, "store", store)
+    monkeypatch.setattr(main, "json_cache", JsonCache(store))
+    with TestClient(main.app) as client:
+        yield client
+
+
+def create_items(client, count: int) -> list[int]:
+    return [client.post("/items/", json={"name": f"item {i}", "price": i + 1.0}).json()["id"] for i in range(count)]
+
+
+@pytest.mark.parametrize("accept", ["application/json", "application/x-ndjson"])
+def test_pages_follow_the_next_cursor(client, accept):
+    item_ids = create_items(client, 5)
+    seen = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/items/", params=params, headers={"Accept": accept})
+        if accept == "application/x-ndjson":
+            page = [StoredItem.model_validate_json(line).id for line in response.text.splitlines()]
+        else:
+            page = [item["id"] for item in response.json()]
+        seen += page
+        if "X-Next-Cursor" not in response.headers:
+            break
+        assert response.headers["X-Next-Cursor"] == str(page[-1])
+        params["after"] = response.headers["X-Next-Cursor"]
+    assert seen == item_ids
+
+
+def test_ndjson_without_limit_streams_everything(client):
+    item_ids = create_items(client, 300)
+    response = client.get("/items/", headers={"Accept": "application/x-ndjson"})
+    assert "X-Next-Cursor" not in response.headers
+    assert [StoredItem.model_validate_json(line).id for line in response.text.splitlines()] == item_ids
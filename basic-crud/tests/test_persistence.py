@@ -0,0 +1,52 @@
+import errno
+import threading
+
+import pytest
+
+import persistence
+from persistence import DurableStore, LogWriteError
+from schemas import Item
+from store import ItemStore
+
+
+def create_in_thread(store: DurableStore) -> list:
+    """
+    Create an item from another thread and return what it raised, failing if it hangs.
+    """
+    outcome = []
+
+    def create():
+        try:
+            outcome.append(store.create(Item(name="item", price=1.0)))
+        except Exception as e:
+            outcome.append(e)
+
+    worker = threading.Thread(target=create, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    assert not worker.is_alive(), "the write is still waiting for the log"
+    return outcome
+
+
+def test_writes_survive_a_restart(tmp_path):
+    store = DurableStore(ItemStore(), str(tmp_path))
+    item_id = store.create(Item(name="item", price=1.0))
+    store.close()
+    assert DurableStore(ItemStore(), str(tmp_path)).get(item_id) == Item(name="item", price=1.0)
+
+
+def test_failed_fsync_fails_writes_instead_of_hanging(tmp_path, monkeypatch):
+    store = DurableStore(ItemStore(), str(tmp_path))
+    store.create(Item(name="item", price=1.0))
+
+    def fail(fd):
+        raise OSError(errno.EIO, "Input/output error")
+
+    monkeypatch.setattr(persistence.os, "fsync", fail)
+    for _ in range(2):
+        (outcome,) = create_in_thread(store)
+        assert isinstance(outcome, LogWriteError)
+        assert isinstance(outcome.__cause__, OSError)
+    with pytest.raises(LogWriteError):
+        store.snapshot()
+    store.close()
@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+
+import pytest
+
+from schemas import Item
+from store import ItemStore
+
+
+def make_store(count: int) -> ItemStore:
+    store = ItemStore()
+    store.bulk_create([Item(name=f"item {i}", price=float(i % 100 + 1)) for i in range(count)])
+    return store
+
+
+@pytest.mark.parametrize("after", [None, -1, -2, -5000])
+def test_items_after_below_first_id_returns_everything(after):
+    store = make_store(3000)
+    assert [item_id for item_id, _ in store.items(after)] == list(range(3000))
+
+
+def test_items_after_skips_up_to_and_including_after():
+    store = make_store(3000)
+    assert [item_id for item_id, _ in store.items(2047)] == list(range(2048, 3000))
+
+
+def read_consistently(store: ItemStore, threads: int, duration: float, errors: list):
+    """
+    Read from `threads` threads for `duration` seconds.
+    Every snapshot a reader takes must be internally consistent.
+    """
+    deadline = time.monotonic() + duration
+
+    def read(slot: int):
+        rng = random.Random(slot)
+        try:
+            while time.monotonic() < deadline:
+                snapshot = store.snapshot()
+                for _ in range(100):
+                    item_id = rng.randrange(snapshot.next_id)
+                    item = snapshot.get(item_id)
+                    assert item is None or item.name == f"item {item_id}"
+                if rng.random() < 0.05:
+                    # A snapshot never changes, whatever the writer does meanwhile.
+                    assert sum(1 for _ in snapshot.items()) == len(snapshot)
+                    assert sum(1 for _ in snapshot.price_range()) == len(snapshot)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=read, args=(slot,)) for slot in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def test_reads_do_not_wait_for_a_writer_holding_the_lock():
+    store = make_store(3000)
+    done = threading.Event()
+
+    def read():
+        store.get(1500)
+        store.version(1500)
+        list(store.items(2000))
+        list(store.price_range(10, 20))
+        store.columns()
+        len(store)
+        done.set()
+
+    # Hold the writers' lock, as a writer in the middle of a write does.
+    with store._lock:
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        assert done.wait(timeout=5), "a read waited for the writers' lock"
+
+
+def test_reads_stay_consistent_while_writing():
+    store = make_store(5000)
+    errors = []
+    stop = threading.Event()
+    writes = 0
+
+    def write():
+        nonlocal writes
+        rng = random.Random(0)
+        try:
+            while not stop.is_set():
+                item_id = rng.randrange(store.next_id)
+                action = rng.random()
+                if action < 0.4:
+                    store.create(Item(name=f"item {store.next_id}", price=rng.uniform(1, 100)))
+                elif action < 0.8:
+                    store.update(item_id, Item(name=f"item {item_id}", price=rng.uniform(1, 100)))
+                else:
+                    store.delete(item_id)
+                writes += 1
+        except Exception as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        read_consistently(store, 8, 0.5, errors)
+    finally:
+        stop.set()
+        writer.join()
+
+    assert not errors, errors
+    assert writes > 0
+    assert sum(1 for _ in store.items()) == len(store)
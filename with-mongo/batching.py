@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+# --- Insert Coalescing ---
+# Many small concurrent POST /items/ requests each cost a round trip to
+# MongoDB. With INSERT_BATCHING enabled, they are instead queued here for a
+# short window and written together with one unordered insert_many. Each
+# request still waits for, and gets back, its own document.
+#
+# The window adapts to load: a batch that held a single document means
+# nobody else was inserting, so waiting only added latency and the window
+# shrinks; a batch that gathered several documents means waiting pays off,
+# so the window grows, up to `max_wait`.
+
+
+class InsertBatcher:
+    """
+    Coalesces concurrent inserts into batched insert_many calls.
+
+    `insert_many` is an async callable taking a list of documents and
+    returning {position: error} for the ones that failed, like
+    crud_async.insert_items.
+    """
+
+    def __init__(self, insert_many, max_docs: int, max_wait: float):
+        self._insert_many = insert_many
+        self._max_docs = max_docs
+        self._max_wait = max_wait
+        self._min_wait = max_wait / 16
+        self.window = max_wait
+        self._pending = []
+        self._timer = None
+        self._writes = set()
+
+        self.batches = 0
+        self.documents = 0
+        self.largest_batch = 0
+        self.write_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    async def insert(self, document: dict) -> dict:
+        """
+        Insert `document` as part of the next batch and return it once written, with its `_id`.
+        Raises the WriteError insert_one would have raised if the document was rejected.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future, time.perf_counter()))
+        if len(self._pending) >= self._max_docs:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def stats(self) -> dict:
+        """
+        Batch-size and latency figures since startup.
+        """
+        return {
+            "batches": self.batches,
+            "documents": self.documents,
+            "mean_batch_size": self.documents / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "window_ms": self.window * 1000,
+            "mean_write_ms": self.write_seconds / self.batches * 1000 if self.batches else 0.0,
+            "mean_latency_ms": self.wait_seconds / self.documents * 1000 if self.documents else 0.0,
+        }
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if len(batch) < self._max_docs:
+            if len(batch) == 1:
+                self.window = max(self.window / 2, self._min_wait)
+            else:
+                self.window = min(self.window * 2, self._max_wait)
+        # Keep a reference to the task so it is not garbage collected mid-write.
+        task = asyncio.ensure_future(self._write(batch))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: list):
+        start = time.perf_counter()
+        try:
+            errors = await self._insert_many([document for document, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        end = time.perf_counter()
+
+        self.batches += 1
+        self.documents += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.write_seconds += end - start
+        for position, (document, future, queued) in enumerate(batch):
+            self.wait_seconds += end - queued
+            # A request that was cancelled while waiting no longer has anyone to answer.
+            if future.done():
+                continue
+            if position in errors:
+                future.set_exception(errors[position])
+            else:
+                future.set_result(document)
@@ -0,0 +1,152 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+
+# --- Item Cache ---
+# A few items get most of the reads, so crud.get_item keeps recently read
+# items in memory: at most `max_entries` of them (least recently used are
+# evicted first), each for at most `ttl` seconds so changes made by other
+# processes are picked up eventually. Writes in this process invalidate the
+# item right away.
+#
+# When a popular item is missing, all concurrent requests for it wait for a
+# single database read instead of each issuing their own (stampede guard).
+
+
+class ItemCache:
+    """
+    A size-bounded LRU cache with a time to live, keyed by item ID (or any hashable key).
+    Safe to use from the thread pool and from the event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._loading = {}  # key -> future of the read in progress
+        # Bumped by every invalidation; a read that overlapped one is not cached.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0
+
+    def get(self, key):
+        """
+        Return the cached value for `key`, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def get_or_load(self, key, load):
+        """
+        Return the cached value for `key`, calling `load()` on a miss.
+        Concurrent misses on the same key share one call. None is never cached.
+        """
+        if not self.enabled:
+            return load()
+        value = self.get(key)
+        if value is not None:
+            return value
+        future, generation = self._start_load(key, concurrent.futures.Future)
+        if generation is None:
+            return future.result()
+        try:
+            value = load()
+        except BaseException as e:
+            self._fail_load(key, future, e)
+            raise
+        self._finish_load(key, future, value, generation)
+        return value
+
+    async def get_or_load_async(self, key, load):
+        """
+        Same as get_or_load(), with `load` an async callable.
+        """
+        if not self.enabled:
+            return await load()
+        value = self.get(key)
+        if value is not None:
+            return value
+        future, generation = self._start_load(key, asyncio.get_running_loop().create_future)
+        if generation is None:
+            return await future
+        try:
+            value = await load()
+        except BaseException as e:
+            self._fail_load(key, future, e)
+            raise
+        self._finish_load(key, future, value, generation)
+        return value
+
+    def invalidate(self, key):
+        """
+        Drop `key`, and keep reads already in progress for it from caching what they read.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+
+    def stats(self) -> dict:
+        """
+        Hit, miss and eviction counts since startup.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _start_load(self, key, new_future):
+        # Returns the future to wait on, and the current generation if the
+        # caller is the one that must do the read (None if it must wait).
+        with self._lock:
+            future = self._loading.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, None
+            future = self._loading[key] = new_future()
+            return future, self._generation
+
+    def _finish_load(self, key, future, value, generation: int):
+        with self._lock:
+            if value is not None and generation == self._generation:
+                self._entries[key] = (time.monotonic() + self._ttl, value)
+                self._entries.move_to_end(key)
+                if len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            del self._loading[key]
+        future.set_result(value)
+
+    def _fail_load(self, key, future, error: BaseException):
+        with self._lock:
+            del self._loading[key]
+        future.set_exception(error)
+        # Nobody may be waiting; avoid "exception was never retrieved" warnings.
+        if isinstance(future, asyncio.Future):
+            future.exception()
@@ -1,7 +1,22 @@
 # from pymongo.collection import Collection
+import re
 from bson import ObjectId
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
 from . import schemas
-from .database import get_collection
+from .cache import ItemCache
+from .database import ITEM_CACHE_SIZE, ITEM_CACHE_TTL_SECONDS, MONGO_BATCH_SIZE, STATS_CACHE_TTL_SECONDS, get_collection
+
+# Recently read items, shared by this module and crud_async (see cache.py).
+item_cache = ItemCache(ITEM_CACHE_SIZE, ITEM_CACHE_TTL_SECONDS)
+
+# Recently computed statistics, by filter and price bands. They are not
+# invalidated by writes, only expire, so they may lag behind by up to
+# STATS_CACHE_TTL_SECONDS.
+stats_cache = ItemCache(256, STATS_CACHE_TTL_SECONDS)
+
+# Price band boundaries used by get_item_stats when none are given.
+DEFAULT_PRICE_BANDS = [0, 10, 50, 100, 500, 1000]
 
 def create_item(item: schemas.ItemCreate) -> schemas.Item:
     """
@@ -15,9 +30,37 @@ def create_item(item: schemas.ItemCreate) -> schemas.Item:
     """
     collection = get_collection()
     item_dict = item.dict()
-    inserted_id = collection.insert_one(item_dict).inserted_id
-    created_item = collection.find_one({"_id": inserted_id})
-    return schemas.Item(**created_item)
+    # insert_one adds the generated `_id` to item_dict, so the response can be
+    # built from it without reading the document back.
+    collection.insert_one(item_dict)
+    return schemas.Item(**item_dict)
+
+def insert_items(documents: list[dict]) -> dict[int, WriteError]:
+    """
+    Insert several documents with one unordered insert_many.
+
+    Args:
+        documents: The documents to insert. Each gets its generated `_id` added in place.
+
+    Returns:
+        The error for each document that could not be inserted, by position.
+    """
+    collection = get_collection()
+    try:
+        collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        return write_errors(e)
+    return {}
+
+def write_errors(error: BulkWriteError) -> dict[int, WriteError]:
+    """
+    Split a BulkWriteError into the error each failed operation would have raised on its own, by position.
+    """
+    errors = {}
+    for details in error.details.get("writeErrors", []):
+        error_class = DuplicateKeyError if details.get("code") == 11000 else WriteError
+        errors[details["index"]] = error_class(details.get("errmsg"), details.get("code"), details)
+    return errors
 
 def get_item(item_id: str) -> schemas.Item:
     """
@@ -29,25 +72,167 @@ def get_item(item_id: str) -> schemas.Item:
     Returns:
         The retrieved item, or None if not found.
     """
+    object_id = ObjectId(item_id)
+    return item_cache.get_or_load(object_id, lambda: _load_item(object_id))
+
+def _load_item(object_id: ObjectId) -> schemas.Item | None:
     collection = get_collection()
-    item = collection.find_one({"_id": ObjectId(item_id)})
+    item = collection.find_one({"_id": object_id})
     if item:
         return schemas.Item(**item)
     return None
 
-def get_items() -> list[schemas.Item]:
+def items_query(
+    after: str | None = None, fields: list[str] | None = None, filters: schemas.ItemFilter | None = None
+) -> tuple[dict, dict | None]:
+    """
+    Build the filter and projection for a page of items.
+
+    Items are paged by `_id` (keyset pagination): the next page starts after
+    the last `_id` of the previous one, which the `_id` index finds directly
+    instead of skipping over earlier documents. Each of the `filters` is
+    written so that it can use one of the indexes in database.ITEM_INDEXES.
+
+    Args:
+        after: Only return items whose ID sorts after this one.
+        fields: Only return these item fields (plus `_id`).
+        filters: Only return items meeting these conditions.
+
+    Returns:
+        The query filter and the projection (None for whole documents).
+    """
+    query = {} if after is None else {"_id": {"$gt": ObjectId(after)}}
+    if filters is not None:
+        price = {}
+        if filters.min_price is not None:
+            price["$gte"] = filters.min_price
+        if filters.max_price is not None:
+            price["$lte"] = filters.max_price
+        if price:
+            query["price"] = price
+        if filters.name_prefix:
+            # An anchored, case-sensitive regex becomes a range scan on the name index.
+            query["name"] = {"$regex": "^" + re.escape(filters.name_prefix)}
+        if filters.has_tax is True:
+            query["tax"] = {"$type": "number"}
+        elif filters.has_tax is False:
+            query["tax"] = None
+    projection = None if fields is None else {field: 1 for field in fields}
+    return query, projection
+
+def find_items(
+    after: str | None = None,
+    limit: int | None = None,
+    fields: list[str] | None = None,
+    filters: schemas.ItemFilter | None = None,
+):
     """
-    Retrieve all items from the database.
+    Open a cursor over items in `_id` order, fetching MONGO_BATCH_SIZE documents per round trip.
 
     Returns:
-        A list of all items.
+        A pymongo cursor yielding raw documents.
     """
     collection = get_collection()
+    query, projection = items_query(after, fields, filters)
+    cursor = collection.find(query, projection).sort("_id", 1).batch_size(MONGO_BATCH_SIZE)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return cursor
+
+def get_items(
+    after: str | None = None, limit: int | None = None, filters: schemas.ItemFilter | None = None
+) -> list[schemas.Item]:
+    """
+    Retrieve items from the database, in `_id` order.
+
+    Args:
+        after: Only return items whose ID sorts after this one.
+        limit: Return at most this many items.
+        filters: Only return items meeting these conditions.
+
+    Returns:
+        A list of items.
+    """
     items = []
-    for item in collection.find():
+    for item in find_items(after, limit, filters=filters):
         items.append(schemas.Item(**item))
     return items
 
+def explain_items(filters: schemas.ItemFilter | None = None, limit: int | None = None) -> dict:
+    """
+    Explain how MongoDB runs an item listing with these filters.
+
+    Returns:
+        A summary of the explain output (see explain_summary).
+    """
+    return explain_summary(find_items(limit=limit, filters=filters).explain())
+
+def explain_summary(explain: dict) -> dict:
+    """
+    Pick the winning plan and the execution figures out of an explain result.
+    `examined_per_returned` is 1 when every document read was returned; much
+    more than that means the query is not well served by an index.
+    """
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = []
+    plan = winning_plan
+    while plan:
+        plan = plan.get("queryPlan", plan)
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage") or next(iter(plan.get("inputStages", [])), None)
+    stats = explain.get("executionStats", {})
+    docs_examined = stats.get("totalDocsExamined")
+    docs_returned = stats.get("nReturned")
+    return {
+        "winning_plan": winning_plan,
+        "stages": stages,
+        "index_scan": "IXSCAN" in stages,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": docs_examined,
+        "docs_returned": docs_returned,
+        "examined_per_returned": docs_examined / docs_returned if docs_returned else None,
+        "execution_time_ms": stats.get("executionTimeMillis"),
+    }
+
+def get_item_documents(
+    after: str | None = None,
+    limit: int | None = None,
+    fields: list[str] | None = None,
+    filters: schemas.ItemFilter | None = None,
+) -> list[dict]:
+    """
+    Retrieve items like get_items, but as JSON-ready dicts rather than Item objects.
+
+    Args:
+        fields: Only return these item fields (plus `_id`). By default every
+            item field is returned, None where a document lacks it, as the
+            Item schema would.
+
+    Returns:
+        A list of dicts with `_id` as a string.
+    """
+    if fields is not None:
+        return [serialize_document(document) for document in find_items(after, limit, fields, filters)]
+    return [item_document(document) for document in find_items(after, limit, ITEM_FIELD_NAMES, filters)]
+
+# The item fields, in the order the API returns them.
+ITEM_FIELD_NAMES = list(schemas.ItemBase.model_fields)
+
+def item_document(document: dict) -> dict:
+    """
+    Shape a raw document like a serialized Item, without building one.
+    """
+    shaped = {name: document.get(name) for name in ITEM_FIELD_NAMES}
+    shaped["_id"] = str(document["_id"])
+    return shaped
+
+def serialize_document(document: dict) -> dict:
+    """
+    Make a raw document JSON-serializable, turning its ObjectId into a string.
+    """
+    document["_id"] = str(document["_id"])
+    return document
+
 def update_item(item_id: str, item: schemas.ItemCreate) -> schemas.Item:
     """
     Update an existing item in the database.
@@ -57,12 +242,19 @@ def update_item(item_id: str, item: schemas.ItemCreate) -> schemas.Item:
         item: The new data for the item.
 
     Returns:
-        The updated item.
+        The updated item, or None if no item has that ID.
     """
     collection = get_collection()
-    collection.update_one({"_id": ObjectId(item_id)}, {"$set": item.dict()})
-    updated_item = get_item(item_id)
-    return updated_item
+    # findAndModify applies the update and returns the new document in one round trip.
+    updated_item = collection.find_one_and_update(
+        {"_id": ObjectId(item_id)},
+        {"$set": item.dict()},
+        return_document=ReturnDocument.AFTER,
+    )
+    item_cache.invalidate(ObjectId(item_id))
+    if updated_item:
+        return schemas.Item(**updated_item)
+    return None
 
 def delete_item(item_id: str) -> bool:
     """
@@ -76,4 +268,216 @@ def delete_item(item_id: str) -> bool:
     """
     collection = get_collection()
     result = collection.delete_one({"_id": ObjectId(item_id)})
+    item_cache.invalidate(ObjectId(item_id))
     return result.deleted_count > 0
+
+def bulk_requests(operations: list[schemas.BulkOperation]) -> tuple[list, list[schemas.BulkOperationResult]]:
+    """
+    Turn bulk operations into pymongo write requests.
+
+    Returns:
+        The write requests, and a result for each operation that is filled in
+        once the bulk write has run. Inserts get their `_id` up front, so their
+        result already carries it.
+    """
+    requests, results = [], []
+    for operation in operations:
+        if operation.op == "insert":
+            item_dict = {"_id": ObjectId(), **operation.item.model_dump()}
+            requests.append(InsertOne(item_dict))
+            item_id = str(item_dict["_id"])
+        elif operation.op == "update":
+            requests.append(UpdateOne({"_id": ObjectId(operation.id)}, {"$set": operation.item.model_dump()}))
+            item_id = operation.id
+        else:
+            requests.append(DeleteOne({"_id": ObjectId(operation.id)}))
+            item_id = operation.id
+        results.append(schemas.BulkOperationResult(op=operation.op, status="ok", id=item_id))
+    return requests, results
+
+def bulk_response(details: dict, results: list[schemas.BulkOperationResult]) -> schemas.BulkResponse:
+    """
+    Build the response to a bulk request from pymongo's raw bulk write result,
+    marking the operations listed in its write errors as failed, and the
+    updates and deletes that matched no item as such (see mark_unmatched).
+    """
+    for result in results:
+        if result.op != "insert":
+            item_cache.invalidate(ObjectId(result.id))
+    for error in details.get("writeErrors", []):
+        result = results[error["index"]]
+        result.status = "error"
+        result.code = error.get("code")
+        result.error = error.get("errmsg")
+        if result.op == "insert":
+            result.id = None
+    mark_unmatched(results, "update", details.get("nMatched", 0))
+    mark_unmatched(results, "delete", details.get("nRemoved", 0))
+    return schemas.BulkResponse(
+        inserted=details.get("nInserted", 0),
+        matched=details.get("nMatched", 0),
+        modified=details.get("nModified", 0),
+        deleted=details.get("nRemoved", 0),
+        results=results,
+    )
+
+def mark_unmatched(results: list[schemas.BulkOperationResult], op: str, matched: int):
+    """
+    Set the status of the `op` operations that did not fail from `matched`,
+    the number of them that found their item.
+
+    A bulk write only reports how many updates matched and how many deletes
+    removed something, not which ones. When all or none of them did, that
+    settles every status. Otherwise, updates are marked "unknown" here and
+    resolved by resolve_updates(); deletes stay "unknown", since afterwards
+    their items are gone either way.
+    """
+    applied = [result for result in results if result.op == op and result.status == "ok"]
+    if matched == len(applied):
+        return
+    for result in applied:
+        result.status = "not_found" if matched == 0 else "unknown"
+
+def unresolved_updates(response: schemas.BulkResponse) -> list[ObjectId]:
+    """
+    The IDs of the updates mark_unmatched() could not settle.
+    """
+    return [ObjectId(result.id) for result in response.results if result.op == "update" and result.status == "unknown"]
+
+def resolve_updates(response: schemas.BulkResponse, existing: set[str]):
+    """
+    Settle the updates left "unknown", given which of their items exist after the bulk write.
+    An item also deleted by the same request counts as not found.
+    """
+    for result in response.results:
+        if result.op == "update" and result.status == "unknown":
+            result.status = "ok" if result.id in existing else "not_found"
+
+def bulk_write_items(operations: list[schemas.BulkOperation]) -> schemas.BulkResponse:
+    """
+    Run a mix of inserts, updates and deletes as one unordered bulk write.
+
+    Args:
+        operations: The operations, already validated.
+
+    Returns:
+        The totals, and the result of each operation in the order given.
+        A failed operation does not stop the others.
+    """
+    if not operations:
+        return schemas.BulkResponse()
+    collection = get_collection()
+    requests, results = bulk_requests(operations)
+    try:
+        details = collection.bulk_write(requests, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+    response = bulk_response(details, results)
+    unresolved = unresolved_updates(response)
+    if unresolved:
+        # Only when some, but not all, updates matched: one extra query tells them apart.
+        found = collection.find({"_id": {"$in": unresolved}}, {"_id": 1})
+        resolve_updates(response, {str(document["_id"]) for document in found})
+    return response
+
+def stats_key(filters: schemas.ItemFilter, bands: list[float]) -> tuple:
+    """
+    The stats_cache key for a statistics request.
+    """
+    return tuple(filters.model_dump().items()), tuple(bands)
+
+def stats_pipeline(filters: schemas.ItemFilter, bands: list[float]) -> list[dict]:
+    """
+    Build the aggregation pipeline behind get_item_stats.
+
+    The totals ($group) and the price bands ($bucket) are computed in one pass
+    by $facet, over the items matching `filters`. Items priced outside the
+    bands are gathered in an "other" bucket.
+    """
+    query, _ = items_query(filters=filters)
+    tax = {"$ifNull": ["$tax", 0]}
+    return [
+        {"$match": query},
+        {
+            "$facet": {
+                "totals": [
+                    {
+                        "$group": {
+                            "_id": None,
+                            "count": {"$sum": 1},
+                            "total_price": {"$sum": "$price"},
+                            "min_price": {"$min": "$price"},
+                            "max_price": {"$max": "$price"},
+                            "average_tax": {"$avg": "$tax"},
+                            "total_tax": {"$sum": tax},
+                        }
+                    }
+                ],
+                "bands": [
+                    {
+                        "$bucket": {
+                            "groupBy": "$price",
+                            "boundaries": bands,
+                            "default": "other",
+                            "output": {
+                                "count": {"$sum": 1},
+                                "total_price": {"$sum": "$price"},
+                                "total_with_tax": {"$sum": {"$add": ["$price", tax]}},
+                            },
+                        }
+                    }
+                ],
+            }
+        },
+    ]
+
+def stats_from_result(result: dict, bands: list[float]) -> schemas.ItemStats:
+    """
+    Build the ItemStats for the single document returned by stats_pipeline.
+    """
+    if not result["totals"] or not result["totals"][0]["count"]:
+        return schemas.ItemStats()
+    totals = result["totals"][0]
+    upper_bounds = dict(zip(bands, bands[1:]))
+    price_bands = []
+    for bucket in result["bands"]:
+        other = bucket["_id"] == "other"
+        price_bands.append(
+            schemas.PriceBand(
+                min_price=None if other else bucket["_id"],
+                max_price=None if other else upper_bounds[bucket["_id"]],
+                count=bucket["count"],
+                total_price=bucket["total_price"],
+                total_with_tax=bucket["total_with_tax"],
+            )
+        )
+    return schemas.ItemStats(
+        count=totals["count"],
+        total_price=totals["total_price"],
+        average_price=totals["total_price"] / totals["count"],
+        min_price=totals["min_price"],
+        max_price=totals["max_price"],
+        average_tax=totals["average_tax"],
+        total_tax=totals["total_tax"],
+        total_with_tax=totals["total_price"] + totals["total_tax"],
+        bands=price_bands,
+    )
+
+def get_item_stats(filters: schemas.ItemFilter, bands: list[float] | None = None) -> schemas.ItemStats:
+    """
+    Compute statistics over the items matching `filters`, in the database.
+
+    Args:
+        filters: Only count items meeting these conditions.
+        bands: Ascending price boundaries of the histogram; defaults to DEFAULT_PRICE_BANDS.
+
+    Returns:
+        The statistics, possibly computed up to STATS_CACHE_TTL_SECONDS ago.
+    """
+    bands = bands or DEFAULT_PRICE_BANDS
+    return stats_cache.get_or_load(stats_key(filters, bands), lambda: _aggregate_stats(filters, bands))
+
+def _aggregate_stats(filters: schemas.ItemFilter, bands: list[float]) -> schemas.ItemStats:
+    collection = get_collection()
+    result = next(collection.aggregate(stats_pipeline(filters, bands)))
+    return stats_from_result(result, bands)
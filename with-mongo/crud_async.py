@@ -0,0 +1,232 @@
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, WriteError
+from . import schemas
+from .crud import (
+    DEFAULT_PRICE_BANDS,
+    ITEM_FIELD_NAMES,
+    bulk_requests,
+    bulk_response,
+    resolve_updates,
+    unresolved_updates,
+    explain_summary,
+    item_cache,
+    item_document,
+    items_query,
+    serialize_document,
+    stats_cache,
+    stats_from_result,
+    stats_key,
+    stats_pipeline,
+    write_errors,
+)
+from .database import MONGO_BATCH_SIZE, get_async_collection
+
+# Asynchronous counterparts of the functions in crud.py, built on motor.
+# They are used when MONGO_DRIVER=motor, so requests wait on MongoDB without
+# holding a thread-pool slot.
+
+async def create_item(item: schemas.ItemCreate) -> schemas.Item:
+    """
+    Create a new item in the database.
+
+    Args:
+        item: The item to create, based on the ItemCreate schema.
+
+    Returns:
+        The created item, based on the Item schema.
+    """
+    collection = get_async_collection()
+    item_dict = item.dict()
+    # insert_one adds the generated `_id` to item_dict, so the response can be
+    # built from it without reading the document back.
+    await collection.insert_one(item_dict)
+    return schemas.Item(**item_dict)
+
+async def insert_items(documents: list[dict]) -> dict[int, WriteError]:
+    """
+    Insert several documents with one unordered insert_many.
+
+    Args:
+        documents: The documents to insert. Each gets its generated `_id` added in place.
+
+    Returns:
+        The error for each document that could not be inserted, by position.
+    """
+    collection = get_async_collection()
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        return write_errors(e)
+    return {}
+
+async def get_item(item_id: str) -> schemas.Item:
+    """
+    Retrieve a single item from the database by its ID.
+
+    Args:
+        item_id: The ID of the item to retrieve.
+
+    Returns:
+        The retrieved item, or None if not found.
+    """
+    object_id = ObjectId(item_id)
+    return await item_cache.get_or_load_async(object_id, lambda: _load_item(object_id))
+
+async def _load_item(object_id: ObjectId) -> schemas.Item | None:
+    collection = get_async_collection()
+    item = await collection.find_one({"_id": object_id})
+    if item:
+        return schemas.Item(**item)
+    return None
+
+def find_items(
+    after: str | None = None,
+    limit: int | None = None,
+    fields: list[str] | None = None,
+    filters: schemas.ItemFilter | None = None,
+):
+    """
+    Open a cursor over items in `_id` order, fetching MONGO_BATCH_SIZE documents per round trip.
+
+    Returns:
+        A motor cursor yielding raw documents.
+    """
+    collection = get_async_collection()
+    query, projection = items_query(after, fields, filters)
+    cursor = collection.find(query, projection).sort("_id", 1).batch_size(MONGO_BATCH_SIZE)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    return cursor
+
+async def get_items(
+    after: str | None = None, limit: int | None = None, filters: schemas.ItemFilter | None = None
+) -> list[schemas.Item]:
+    """
+    Retrieve items from the database, in `_id` order.
+
+    Args:
+        after: Only return items whose ID sorts after this one.
+        limit: Return at most this many items.
+        filters: Only return items meeting these conditions.
+
+    Returns:
+        A list of items.
+    """
+    items = []
+    async for item in find_items(after, limit, filters=filters):
+        items.append(schemas.Item(**item))
+    return items
+
+async def get_item_documents(
+    after: str | None = None,
+    limit: int | None = None,
+    fields: list[str] | None = None,
+    filters: schemas.ItemFilter | None = None,
+) -> list[dict]:
+    """
+    Retrieve items like get_items, but as JSON-ready dicts rather than Item objects.
+
+    Args:
+        fields: Only return these item fields (plus `_id`). By default every
+            item field is returned, None where a document lacks it, as the
+            Item schema would.
+
+    Returns:
+        A list of dicts with `_id` as a string.
+    """
+    if fields is not None:
+        return [serialize_document(document) async for document in find_items(after, limit, fields, filters)]
+    return [item_document(document) async for document in find_items(after, limit, ITEM_FIELD_NAMES, filters)]
+
+async def explain_items(filters: schemas.ItemFilter | None = None, limit: int | None = None) -> dict:
+    """
+    Explain how MongoDB runs an item listing with these filters.
+
+    Returns:
+        A summary of the explain output (see crud.explain_summary).
+    """
+    return explain_summary(await find_items(limit=limit, filters=filters).explain())
+
+async def update_item(item_id: str, item: schemas.ItemCreate) -> schemas.Item:
+    """
+    Update an existing item in the database.
+
+    Args:
+        item_id: The ID of the item to update.
+        item: The new data for the item.
+
+    Returns:
+        The updated item, or None if no item has that ID.
+    """
+    collection = get_async_collection()
+    # findAndModify applies the update and returns the new document in one round trip.
+    updated_item = await collection.find_one_and_update(
+        {"_id": ObjectId(item_id)},
+        {"$set": item.dict()},
+        return_document=ReturnDocument.AFTER,
+    )
+    item_cache.invalidate(ObjectId(item_id))
+    if updated_item:
+        return schemas.Item(**updated_item)
+    return None
+
+async def delete_item(item_id: str) -> bool:
+    """
+    Delete an item from the database.
+
+    Args:
+        item_id: The ID of the item to delete.
+
+    Returns:
+        True if the item was deleted, False otherwise.
+    """
+    collection = get_async_collection()
+    result = await collection.delete_one({"_id": ObjectId(item_id)})
+    item_cache.invalidate(ObjectId(item_id))
+    return result.deleted_count > 0
+
+async def bulk_write_items(operations: list[schemas.BulkOperation]) -> schemas.BulkResponse:
+    """
+    Run a mix of inserts, updates and deletes as one unordered bulk write.
+
+    Args:
+        operations: The operations, already validated.
+
+    Returns:
+        The totals, and the result of each operation in the order given.
+        A failed operation does not stop the others.
+    """
+    if not operations:
+        return schemas.BulkResponse()
+    collection = get_async_collection()
+    requests, results = bulk_requests(operations)
+    try:
+        details = (await collection.bulk_write(requests, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+    response = bulk_response(details, results)
+    unresolved = unresolved_updates(response)
+    if unresolved:
+        found = collection.find({"_id": {"$in": unresolved}}, {"_id": 1})
+        resolve_updates(response, {str(document["_id"]) async for document in found})
+    return response
+
+async def get_item_stats(filters: schemas.ItemFilter, bands: list[float] | None = None) -> schemas.ItemStats:
+    """
+    Compute statistics over the items matching `filters`, in the database.
+
+    Args:
+        filters: Only count items meeting these conditions.
+        bands: Ascending price boundaries of the histogram; defaults to DEFAULT_PRICE_BANDS.
+
+    Returns:
+        The statistics, possibly computed up to STATS_CACHE_TTL_SECONDS ago.
+    """
+    bands = bands or DEFAULT_PRICE_BANDS
+    return await stats_cache.get_or_load_async(stats_key(filters, bands), lambda: _aggregate_stats(filters, bands))
+
+async def _aggregate_stats(filters: schemas.ItemFilter, bands: list[float]) -> schemas.ItemStats:
+    collection = get_async_collection()
+    results = await collection.aggregate(stats_pipeline(filters, bands)).to_list(length=1)
+    return stats_from_result(results[0], bands)
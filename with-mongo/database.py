@@ -1,5 +1,6 @@
-from pymongo import MongoClient
+from pymongo import ASCENDING, IndexModel, MongoClient
 import os
+from .monitoring import CommandMetrics, PoolStats
 
 # --- MongoDB Connection ---
 # Load the MongoDB connection string from an environment variable if it exists,
@@ -7,11 +8,96 @@ import os
 # This is a good practice for managing configuration secrets.
 MONGO_CONNECTION_STRING = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
 
+# Which driver the API uses: "pymongo" (synchronous, endpoints run in the
+# thread pool) or "motor" (asynchronous, endpoints run on the event loop).
+MONGO_DRIVER = os.getenv("MONGO_DRIVER", "pymongo").lower()
+USE_MOTOR = MONGO_DRIVER == "motor"
+
+# Connection pool sizing, applied to whichever client is in use.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+
+# How long an operation waits for a reachable server before failing.
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+
+# Health probing and circuit breaking (see health.py).
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "5"))
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_RESET_TIMEOUT_SECONDS = float(os.getenv("CIRCUIT_RESET_TIMEOUT_SECONDS", "10"))
+
+# Every command sent by either client is timed, and their connection pools
+# are tracked (see monitoring.py).
+pool_stats = PoolStats()
+
+client_options = {
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+    "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    "event_listeners": [CommandMetrics(), pool_stats],
+}
+
+# How many documents a cursor fetches per round trip when listing items.
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "500"))
+
+# Opt-in coalescing of concurrent POST /items/ requests into one insert_many
+# (see batching.py): at most INSERT_BATCH_MAX_DOCS documents per batch, and a
+# request waits at most INSERT_BATCH_MAX_WAIT_MS for others to join it.
+INSERT_BATCHING = os.getenv("INSERT_BATCHING", "false").lower() in ("1", "true", "yes")
+INSERT_BATCH_MAX_DOCS = int(os.getenv("INSERT_BATCH_MAX_DOCS", "500"))
+INSERT_BATCH_MAX_WAIT_MS = float(os.getenv("INSERT_BATCH_MAX_WAIT_MS", "5"))
+
+# Size (0 disables it) and time to live of the in-process cache of items read by ID.
+ITEM_CACHE_SIZE = int(os.getenv("ITEM_CACHE_SIZE", "10000"))
+ITEM_CACHE_TTL_SECONDS = float(os.getenv("ITEM_CACHE_TTL_SECONDS", "30"))
+
+# How long GET /items/_stats results are reused before being computed again.
+STATS_CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL_SECONDS", "10"))
+
+# Encode item listings straight from the documents with orjson, skipping the
+# Item models and response_model validation.
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+
+# Indexes behind the filters of GET /items/ (see crud.items_query). They are
+# created, or rebuilt if their definition changed, at startup by ensure_indexes().
+ITEM_INDEXES = [
+    IndexModel([("price", ASCENDING)], name="price_1"),
+    IndexModel([("name", ASCENDING)], name="name_1"),
+    IndexModel([("tax", ASCENDING)], name="tax_1"),
+]
+
+DATABASE_NAME = "fastapi_mongo_crud"
+COLLECTION_NAME = "items"
+
 # Create a MongoDB client, database, and collection.
 # These will be shared across the application.
-client = MongoClient(MONGO_CONNECTION_STRING)
-db = client["fastapi_mongo_crud"]
-collection = db["items"]
+client = MongoClient(MONGO_CONNECTION_STRING, **client_options)
+db = client[DATABASE_NAME]
+collection = db[COLLECTION_NAME]
+
+# The asynchronous client is only created in motor mode, so motor is only
+# needed when it is actually used.
+async_client = None
+if USE_MOTOR:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    async_client = AsyncIOMotorClient(MONGO_CONNECTION_STRING, **client_options)
+
+# The health probe pings through its own small client, whose timeouts match
+# HEALTH_PROBE_TIMEOUT_SECONDS: a probe that times out then also stops waiting
+# for a server, instead of holding a thread for the full selection timeout.
+probe_options = {
+    "maxPoolSize": 1,
+    "serverSelectionTimeoutMS": int(HEALTH_PROBE_TIMEOUT_SECONDS * 1000),
+    "connectTimeoutMS": int(HEALTH_PROBE_TIMEOUT_SECONDS * 1000),
+    "socketTimeoutMS": int(HEALTH_PROBE_TIMEOUT_SECONDS * 1000),
+}
+probe_client = None
+async_probe_client = None
+if USE_MOTOR:
+    async_probe_client = AsyncIOMotorClient(MONGO_CONNECTION_STRING, **probe_options)
+else:
+    probe_client = MongoClient(MONGO_CONNECTION_STRING, **probe_options)
 
 def get_db():
     """
@@ -24,3 +110,42 @@ def get_collection():
     Returns the default MongoDB collection instance.
     """
     return collection
+
+def get_async_collection():
+    """
+    Returns the default collection on the asynchronous (motor) client.
+    """
+    return async_client[DATABASE_NAME][COLLECTION_NAME]
+
+def stale_indexes(existing: dict) -> list[str]:
+    """
+    Return the names of declared indexes that exist with different keys, and must be rebuilt.
+
+    Args:
+        existing: The collection's index_information().
+    """
+    stale = []
+    for index in ITEM_INDEXES:
+        spec = index.document
+        info = existing.get(spec["name"])
+        if info is not None and list(info["key"]) != list(spec["key"].items()):
+            stale.append(spec["name"])
+    return stale
+
+def ensure_indexes():
+    """
+    Bring the collection's indexes in line with ITEM_INDEXES. Indexes that are
+    not declared there are left alone.
+    """
+    for name in stale_indexes(collection.index_information()):
+        collection.drop_index(name)
+    collection.create_indexes(ITEM_INDEXES)
+
+async def ensure_indexes_async():
+    """
+    Same as ensure_indexes(), on the asynchronous (motor) client.
+    """
+    async_collection = get_async_collection()
+    for name in stale_indexes(await async_collection.index_information()):
+        await async_collection.drop_index(name)
+    await async_collection.create_indexes(ITEM_INDEXES)
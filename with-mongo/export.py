@@ -0,0 +1,127 @@
+"""
+Columnar export of the items collection as Arrow IPC or Parquet.
+
+Documents are copied from the cursor straight into per-column lists and
+turned into Arrow record batches, without building an `Item` for each one.
+Each record batch is encoded as soon as it is full, so the export goes out
+as a stream and never holds the whole collection in memory.
+"""
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Column types of an exported item. `_id` is exported as its hex string.
+ITEM_SCHEMA = pa.schema(
+    [
+        ("_id", pa.string()),
+        ("name", pa.string()),
+        ("description", pa.string()),
+        ("price", pa.float64()),
+        ("tax", pa.float64()),
+    ]
+)
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class _Buffer:
+    """
+    A write-only file that hands back what was written to it since the last call to `take()`.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+class ExportWriter:
+    """
+    Encodes item documents in the given format, one record batch at a time.
+
+    Add documents with `add()`; whenever a batch is full it returns the
+    encoded bytes to send. `finish()` returns whatever is left, including
+    the Parquet footer.
+    """
+
+    def __init__(self, format: str, batch_size: int):
+        self._batch_size = batch_size
+        self._columns = {name: [] for name in ITEM_SCHEMA.names}
+        self._count = 0
+        self._buffer = _Buffer()
+        if format == "parquet":
+            self._writer = pq.ParquetWriter(self._buffer, ITEM_SCHEMA)
+        else:
+            self._writer = pa.ipc.new_stream(self._buffer, ITEM_SCHEMA)
+
+    def add(self, document: dict) -> bytes:
+        columns = self._columns
+        columns["_id"].append(str(document["_id"]))
+        columns["name"].append(document.get("name"))
+        columns["description"].append(document.get("description"))
+        columns["price"].append(document.get("price"))
+        columns["tax"].append(document.get("tax"))
+        self._count += 1
+        if self._count == self._batch_size:
+            return self._flush()
+        return b""
+
+    def finish(self) -> bytes:
+        data = self._flush() if self._count else b""
+        self._writer.close()
+        return data + self._buffer.take()
+
+    def _flush(self) -> bytes:
+        arrays = [pa.array(self._columns[field.name], type=field.type) for field in ITEM_SCHEMA]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=ITEM_SCHEMA))
+        for values in self._columns.values():
+            values.clear()
+        self._count = 0
+        return self._buffer.take()
+
+
+def export_chunks(cursor, format: str, batch_size: int):
+    """
+    Encode the documents of a pymongo cursor, yielding the bytes of each record batch.
+    """
+    writer = ExportWriter(format, batch_size)
+    for document in cursor:
+        data = writer.add(document)
+        if data:
+            yield data
+    yield writer.finish()
+
+
+async def export_chunks_async(cursor, format: str, batch_size: int):
+    """
+    Encode the documents of a motor cursor, yielding the bytes of each record batch.
+    """
+    writer = ExportWriter(format, batch_size)
+    async for document in cursor:
+        data = writer.add(document)
+        if data:
+            yield data
+    yield writer.finish()
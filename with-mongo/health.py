@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+# --- Health Probing and Circuit Breaking ---
+# Without these, every request made while MongoDB is unreachable waits for
+# the full server selection timeout before failing. Instead, a background
+# task pings the database at a fixed interval and /health answers from its
+# last result, and a circuit breaker in front of the crud calls fails them
+# immediately while the database is known to be down.
+#
+# The breaker opens after `failure_threshold` consecutive connection
+# failures, or as soon as a probe fails. Once `reset_timeout` has passed it
+# lets a single trial call through (half-open): if that succeeds, or a
+# probe does, the breaker closes again; if it fails, it stays open. Only
+# connection failures count as failures: any other error from the server
+# shows that it is reachable.
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the database while the circuit breaker is open.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__("Database unavailable")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_started_at = None
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the database must not be called right now.
+        """
+        now = time.monotonic()
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.OPEN and now - self._opened_at >= self._reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # One trial call at a time; a trial that never reported back is
+            # given up on after reset_timeout.
+            if self._trial_started_at is None or now - self._trial_started_at >= self._reset_timeout:
+                self._trial_started_at = now
+                return
+        self.rejected += 1
+        raise CircuitOpenError(max(self._opened_at + self._reset_timeout - now, 0.0))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_started_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self._failure_threshold:
+            self.open()
+
+    def release_trial(self):
+        """
+        End a trial call that told nothing about the database, letting the next one through.
+        """
+        self._trial_started_at = None
+
+    def open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_started_at = None
+
+    def stats(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures, "rejected_calls": self.rejected}
+
+
+class HealthMonitor:
+    """
+    Pings the database every `interval` seconds in the background and keeps the outcome.
+
+    `ping` is an async callable that raises if the database is unreachable.
+    Probe results are also reported to `breaker`.
+    """
+
+    def __init__(self, ping, breaker: CircuitBreaker, interval: float, timeout: float):
+        self._ping = ping
+        self._breaker = breaker
+        self._interval = interval
+        self._timeout = timeout
+        self._task = None
+
+        self.ready = None  # None until the first probe has finished
+        self.last_probe_at = None
+        self.last_latency = None
+        self.last_error = None
+
+    async def start(self):
+        """
+        Run a first probe, then keep probing in the background.
+        """
+        await self.probe()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def probe(self):
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._ping(), self._timeout)
+        except Exception as e:
+            self.ready = False
+            self.last_error = str(e) or type(e).__name__
+            self._breaker.open()
+        else:
+            self.ready = True
+            self.last_error = None
+            self._breaker.record_success()
+        self.last_probe_at = time.time()
+        self.last_latency = time.monotonic() - start
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "last_probe_at": self.last_probe_at,
+            "last_probe_ms": None if self.last_latency is None else self.last_latency * 1000,
+            "last_error": self.last_error,
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            await self.probe()
@@ -1,67 +1,451 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
-from . import crud, schemas
-from .database import client
+import json
+import logging
+import math
+import time
+from bson import ObjectId
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pymongo.errors import ConnectionFailure, PyMongoError
+from typing import List, Literal, Optional
+from . import crud, crud_async, schemas
+from .batching import InsertBatcher
+from .database import (
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT_SECONDS,
+    FAST_JSON,
+    HEALTH_PROBE_INTERVAL_SECONDS,
+    HEALTH_PROBE_TIMEOUT_SECONDS,
+    INSERT_BATCH_MAX_DOCS,
+    INSERT_BATCH_MAX_WAIT_MS,
+    INSERT_BATCHING,
+    MONGO_BATCH_SIZE,
+    USE_MOTOR,
+    async_probe_client,
+    ensure_indexes,
+    ensure_indexes_async,
+    pool_stats,
+    probe_client,
+)
+from .export import MEDIA_TYPES, export_chunks, export_chunks_async
+from .health import CircuitBreaker, CircuitOpenError, HealthMonitor
+from .monitoring import HTTP_REQUEST_DURATION
+
+# orjson is only needed when the fast JSON path is enabled.
+if FAST_JSON:
+    import orjson
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# With MONGO_DRIVER=motor the endpoints await the asynchronous crud module
+# directly; otherwise the synchronous one runs in the thread pool.
+items_crud = crud_async if USE_MOTOR else crud
+
+
+async def ping_database():
+    if USE_MOTOR:
+        await async_probe_client.admin.command("ping")
+    else:
+        await run_in_threadpool(probe_client.admin.command, "ping")
+
+
+# While MongoDB is unreachable, database calls fail fast with a 503 instead
+# of each waiting for the server selection timeout (see health.py).
+breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT_SECONDS)
+health_monitor = HealthMonitor(ping_database, breaker, HEALTH_PROBE_INTERVAL_SECONDS, HEALTH_PROBE_TIMEOUT_SECONDS)
+
+
+async def call_crud(func, *args):
+    """
+    Await an asynchronous crud function, or run a synchronous one in the thread pool.
+    Raises CircuitOpenError without calling it while the database is unavailable.
+    """
+    breaker.before_call()
+    try:
+        if USE_MOTOR:
+            result = await func(*args)
+        else:
+            result = await run_in_threadpool(func, *args)
+    except BaseException as e:
+        report_error(e)
+        raise
+    breaker.record_success()
+    return result
+
+
+def report_error(error: BaseException):
+    """
+    Tell the circuit breaker what an error raised by a database call says about the database.
+    """
+    if isinstance(error, ConnectionFailure):
+        breaker.record_failure()
+    elif isinstance(error, PyMongoError):
+        # Any other database error (a duplicate key, a failed command...) is an answer from the server.
+        breaker.record_success()
+    else:
+        # Invalid input caught before the database was reached, or a cancelled
+        # request: nothing was learned, so only let another trial call through.
+        breaker.release_trial()
+
+
+async def guarded_chunks(chunks):
+    """
+    Pass the chunks of a streamed response through, reporting the outcome to the
+    circuit breaker like call_crud() does. The query only runs once streaming
+    starts, so success is recorded at the first chunk (or at the end of an
+    empty stream) rather than after a long export has been sent in full.
+    """
+    reported = False
+    try:
+        async for chunk in chunks:
+            if not reported:
+                breaker.record_success()
+                reported = True
+            yield chunk
+    except BaseException as e:
+        if not reported or isinstance(e, ConnectionFailure):
+            report_error(e)
+        raise
+    if not reported:
+        breaker.record_success()
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    """
+    Time every request into http_request_duration_seconds, labelled with its route template.
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_DURATION.labels(
+        request.method, route.path if route is not None else "<unmatched>", response.status_code
+    ).observe(time.perf_counter() - start)
+    return response
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database not available"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.exception_handler(ConnectionFailure)
+async def connection_failure_handler(request: Request, exc: ConnectionFailure):
+    return JSONResponse(status_code=503, content={"detail": f"Database not available: {exc}"})
+
+
+@app.on_event("startup")
+async def startup_event():
+    """
+    Start probing the database, then create the indexes the item filters
+    rely on, or update them if they changed.
+    """
+    await health_monitor.start()
+    if not health_monitor.ready:
+        logger.warning("Database not available at startup, indexes not checked: %s", health_monitor.last_error)
+        return
+    try:
+        if USE_MOTOR:
+            await ensure_indexes_async()
+        else:
+            await run_in_threadpool(ensure_indexes)
+    except PyMongoError as e:
+        # Serve anyway: filtered queries still work, only slower.
+        logger.warning("Could not create indexes: %s", e)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await health_monitor.stop()
+
+
+async def insert_items(documents: list[dict]):
+    return await call_crud(items_crud.insert_items, documents)
+
+
+# With INSERT_BATCHING enabled, concurrent creates share insert_many calls.
+insert_batcher = None
+if INSERT_BATCHING:
+    insert_batcher = InsertBatcher(insert_items, INSERT_BATCH_MAX_DOCS, INSERT_BATCH_MAX_WAIT_MS / 1000)
+
 
 @app.post("/items/", response_model=schemas.Item)
-def create_item_endpoint(item: schemas.ItemCreate):
+async def create_item_endpoint(item: schemas.ItemCreate):
     """
     Create a new item.
     """
-    return crud.create_item(item)
+    if insert_batcher is not None:
+        return schemas.Item(**await insert_batcher.insert(item.model_dump()))
+    return await call_crud(items_crud.create_item, item)
+
+
+@app.post("/items/_bulk", response_model=schemas.BulkResponse)
+async def bulk_items_endpoint(operations: List[schemas.BulkOperation]):
+    """
+    Apply a list of insert, update and delete operations in one round trip.
+
+    Each entry is {"op": "insert", "item": {...}}, {"op": "update", "id": ..., "item": {...}}
+    or {"op": "delete", "id": ...}. The whole list is validated before anything
+    is written; then the operations run as one unordered bulk write, and the
+    response reports each one's outcome at its position.
+    """
+    return await call_crud(items_crud.bulk_write_items, operations)
+
+
+@app.get("/stats/inserts")
+async def insert_stats_endpoint():
+    """
+    Batch-size and latency figures of insert coalescing (INSERT_BATCHING).
+    """
+    if insert_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **insert_batcher.stats()}
+
+
+@app.get("/stats/cache")
+async def cache_stats_endpoint():
+    """
+    Hit, miss and eviction counts of the item cache behind GET /items/{item_id}.
+    """
+    return crud.item_cache.stats()
+
+
+# Fields a client may ask for with ?fields=; `_id` is always returned.
+ITEM_FIELDS = set(schemas.ItemBase.model_fields)
+
+# Lines of NDJSON sent to the client per chunk when streaming items.
+NDJSON_CHUNK_SIZE = 100
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """
+    Parse a comma-separated ?fields= value, rejecting unknown field names.
+    """
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - ITEM_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def encode_json(value) -> bytes:
+    """
+    Encode plain JSON data (dicts, lists, strings, numbers), with orjson when FAST_JSON is on.
+    """
+    if FAST_JSON:
+        return orjson.dumps(value)
+    return json.dumps(value).encode()
+
+
+def ndjson_chunks(documents):
+    """
+    Encode documents as NDJSON, a chunk of lines at a time.
+    """
+    lines = []
+    for document in documents:
+        lines.append(encode_json(crud.serialize_document(document)))
+        if len(lines) == NDJSON_CHUNK_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+async def ndjson_chunks_async(cursor):
+    """
+    Encode the documents of a motor cursor as NDJSON, a chunk of lines at a time.
+    """
+    lines = []
+    async for document in cursor:
+        lines.append(encode_json(crud.serialize_document(document)))
+        if len(lines) == NDJSON_CHUNK_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
 
 
 @app.get("/items/", response_model=List[schemas.Item])
-def read_items_endpoint():
+async def read_items_endpoint(
+    request: Request,
+    response: Response,
+    filters: schemas.ItemFilter = Depends(),
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+    fields: Optional[str] = None,
+):
     """
-    Retrieve all items.
+    Retrieve items in ID order, optionally filtered by price range
+    (`min_price`, `max_price`), `name_prefix` and `has_tax`.
+
+    Pass the ID of the last item of a page as `after` to get the next one; when
+    a page is full, that ID is also returned in the X-Next-Cursor header.
+    `fields` limits each item to a comma-separated list of fields; such
+    responses, and all of them with FAST_JSON on, are encoded straight from
+    the documents read. With
+    `Accept: application/x-ndjson` the items are streamed one per line
+    instead of being collected into a list.
     """
-    return crud.get_items()
+    names = parse_fields(fields)
+    if after is not None and not ObjectId.is_valid(after):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if "application/x-ndjson" in request.headers.get("accept", ""):
+        breaker.before_call()
+        cursor = items_crud.find_items(after, limit, names, filters)
+        if USE_MOTOR:
+            chunks = ndjson_chunks_async(cursor)
+        else:
+            chunks = iterate_in_threadpool(ndjson_chunks(cursor))
+        return StreamingResponse(guarded_chunks(chunks), media_type="application/x-ndjson")
+
+    if names is None and not FAST_JSON:
+        items = await call_crud(items_crud.get_items, after, limit, filters)
+        if limit is not None and len(items) == limit:
+            response.headers["X-Next-Cursor"] = items[-1].id
+        return items
+
+    # Encode the documents directly, without building Item objects and
+    # validating them again against the response model.
+    documents = await call_crud(items_crud.get_item_documents, after, limit, names, filters)
+    headers = {}
+    if limit is not None and len(documents) == limit:
+        headers["X-Next-Cursor"] = documents[-1]["_id"]
+    return Response(encode_json(documents), media_type="application/json", headers=headers)
+
+
+@app.get("/items/_explain", response_model=dict)
+async def explain_items_endpoint(
+    filters: schemas.ItemFilter = Depends(),
+    limit: Optional[int] = Query(default=None, ge=1),
+):
+    """
+    Debugging aid: show how MongoDB runs GET /items/ with the same filters.
+
+    Returns the winning plan, whether it scans an index, and how many
+    documents were examined per document returned.
+    """
+    return await call_crud(items_crud.explain_items, filters, limit)
+
+
+def parse_bands(bands: Optional[str]) -> Optional[list[float]]:
+    """
+    Parse a comma-separated ?bands= value into ascending price boundaries.
+    """
+    if bands is None:
+        return None
+    try:
+        boundaries = [float(value) for value in bands.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bands must be comma-separated numbers")
+    if len(boundaries) < 2 or any(low >= high for low, high in zip(boundaries, boundaries[1:])):
+        raise HTTPException(status_code=400, detail="bands must list at least two ascending prices")
+    return boundaries
+
+
+@app.get("/items/_stats", response_model=schemas.ItemStats)
+async def item_stats_endpoint(filters: schemas.ItemFilter = Depends(), bands: Optional[str] = None):
+    """
+    Count and total the items matching the same filters as GET /items/, in the database.
+
+    `bands` gives the price boundaries of the histogram, e.g. `0,10,100`;
+    items outside them are counted in a band without bounds. Results are
+    reused for a few seconds (STATS_CACHE_TTL_SECONDS).
+    """
+    return await call_crud(items_crud.get_item_stats, filters, parse_bands(bands))
+
+
+@app.get("/items/export")
+async def export_items_endpoint(format: Literal["arrow", "parquet"] = "arrow"):
+    """
+    Export all items as an Arrow IPC stream or a Parquet file.
+
+    Meant for analytics jobs: the items are sent column by column, in record
+    batches of MONGO_BATCH_SIZE rows, instead of as one JSON object each.
+    """
+    breaker.before_call()
+    cursor = items_crud.find_items()
+    if USE_MOTOR:
+        chunks = export_chunks_async(cursor, format, MONGO_BATCH_SIZE)
+    else:
+        chunks = iterate_in_threadpool(export_chunks(cursor, format, MONGO_BATCH_SIZE))
+    headers = {"Content-Disposition": f'attachment; filename="items.{format}"'}
+    return StreamingResponse(guarded_chunks(chunks), media_type=MEDIA_TYPES[format], headers=headers)
 
 
 @app.get("/items/{item_id}", response_model=schemas.Item)
-def read_item_endpoint(item_id: str):
+async def read_item_endpoint(item_id: str):
     """
     Retrieve a single item by its ID.
     """
-    item = crud.get_item(item_id)
+    item = await call_crud(items_crud.get_item, item_id)
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
 
 
 @app.put("/items/{item_id}", response_model=schemas.Item)
-def update_item_endpoint(item_id: str, item: schemas.ItemCreate):
+async def update_item_endpoint(item_id: str, item: schemas.ItemCreate):
     """
     Update an existing item.
     """
-    updated_item = crud.update_item(item_id, item)
+    updated_item = await call_crud(items_crud.update_item, item_id, item)
     if updated_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return updated_item
 
 
 @app.delete("/items/{item_id}", response_model=dict)
-def delete_item_endpoint(item_id: str):
+async def delete_item_endpoint(item_id: str):
     """
     Delete an item.
     """
-    if not crud.delete_item(item_id):
+    if not await call_crud(items_crud.delete_item, item_id):
         raise HTTPException(status_code=404, detail="Item not found")
     return {"message": "Item deleted successfully"}
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus metrics: MongoDB command latencies, connection pool checkout
+    waits and usage, and HTTP latencies by route.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
-def health_check():
+async def health_check():
     """
     Check if the API and Database are running correctly.
+
+    Answers from the last background probe instead of pinging the database,
+    and also reports the circuit breaker state and connection pool figures.
     """
-    try:
-        # Check MongoDB connection
-        client.admin.command("ping")
-        return {"status": "ok", "database": "connected"}
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Database not available: {str(e)}")
+    if not health_monitor.ready:
+        detail = health_monitor.last_error or "not probed yet"
+        raise HTTPException(status_code=503, detail=f"Database not available: {detail}")
+    return {
+        "status": "ok",
+        "database": "connected",
+        "probe": health_monitor.stats(),
+        "circuit": breaker.stats(),
+        "pool": pool_stats.stats(),
+    }
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """
+    Check that the API process is up, whatever the state of the database.
+    """
+    return {"status": "ok"}
@@ -0,0 +1,128 @@
+import threading
+
+from prometheus_client import Counter, Gauge, Histogram
+from pymongo import monitoring
+
+# --- Command Monitoring ---
+# pymongo reports every command a client sends, and every connection pool
+# event, to registered listeners. Timing commands shows how much of a
+# request is spent in MongoDB. (The number of commands behind each CRUD call
+# is checked by the tests, with a listener of their own.)
+
+
+# --- Prometheus Metrics ---
+# Served on GET /metrics. Mongo latencies come from the listeners below;
+# HTTP latencies from the middleware in main.py.
+COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Time MongoDB took to answer a command, as seen by the driver.",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total",
+    "Commands that MongoDB answered with an error or that failed in the driver.",
+    ["command"],
+)
+CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+CHECKOUT_FAILURES = Counter(
+    "mongo_pool_checkout_failures_total",
+    "Connection checkouts that failed, e.g. on a pool wait timeout.",
+)
+CONNECTIONS_OPEN = Gauge("mongo_pool_connections_open", "Connections open to MongoDB.")
+CONNECTIONS_IN_USE = Gauge("mongo_pool_connections_in_use", "Connections checked out of the pool.")
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, by route.",
+    ["method", "route", "status"],
+)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Tracks the connection pools of the clients it is registered with: how many
+    connections are open and checked out, and how often checkouts failed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        CONNECTIONS_OPEN.set_function(lambda: self.open_connections)
+        CONNECTIONS_IN_USE.set_function(lambda: self.in_use)
+        self.open_connections = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        CHECKOUT_WAIT.observe(event.duration)
+        CHECKOUT_FAILURES.inc()
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        CHECKOUT_WAIT.observe(event.duration)
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Records the latency of every command in the mongo_command_* metrics, by command name.
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        COMMAND_DURATION.labels(event.command_name).observe(event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        COMMAND_DURATION.labels(event.command_name).observe(event.duration_micros / 1_000_000)
+        COMMAND_FAILURES.labels(event.command_name).inc()
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field, BeforeValidator, ConfigDict
-from typing import Optional, Annotated
+from bson import ObjectId
+from pydantic import AfterValidator, BaseModel, Field, BeforeValidator, ConfigDict
+from typing import Literal, Optional, Annotated, Union
 
 # This is a custom type for representing MongoDB's ObjectId in Pydantic models.
 # It uses Pydantic's `Annotated` and `BeforeValidator` to ensure that the
@@ -32,3 +33,98 @@ class Item(ItemBase):
         populate_by_name=True,
         arbitrary_types_allowed=True,
     )
+
+
+class ItemFilter(BaseModel):
+    """
+    Conditions on the items to list, all optional. Only items meeting every given one are returned.
+    """
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    name_prefix: Optional[str] = None
+    has_tax: Optional[bool] = None
+
+class PriceBand(BaseModel):
+    """
+    Totals for the items whose price falls in [min_price, max_price).
+    The band of items outside all requested bands has no bounds.
+    """
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    count: int
+    total_price: float
+    total_with_tax: float
+
+class ItemStats(BaseModel):
+    """
+    Aggregates over the items matching a filter. Tax is an amount added to the price;
+    `average_tax` only counts items that have one.
+    """
+    count: int = 0
+    total_price: float = 0
+    average_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    average_tax: Optional[float] = None
+    total_tax: float = 0
+    total_with_tax: float = 0
+    bands: list[PriceBand] = []
+
+def _check_object_id(value: str) -> str:
+    if not ObjectId.is_valid(value):
+        raise ValueError("not a valid ObjectId")
+    return value
+
+# An item ID sent by the client, checked to be a valid ObjectId.
+ObjectIdStr = Annotated[str, AfterValidator(_check_object_id)]
+
+class BulkInsert(BaseModel):
+    """
+    Insert `item` as a new item.
+    """
+    op: Literal["insert"]
+    item: ItemCreate
+
+class BulkUpdate(BaseModel):
+    """
+    Replace the fields of the item with ID `id` by those of `item`.
+    """
+    op: Literal["update"]
+    id: ObjectIdStr
+    item: ItemCreate
+
+class BulkDelete(BaseModel):
+    """
+    Delete the item with ID `id`.
+    """
+    op: Literal["delete"]
+    id: ObjectIdStr
+
+# One entry of a POST /items/_bulk request, told apart by its "op" field.
+BulkOperation = Annotated[Union[BulkInsert, BulkUpdate, BulkDelete], Field(discriminator="op")]
+
+class BulkOperationResult(BaseModel):
+    """
+    Outcome of one operation of a bulk request, at the same position as the operation.
+    `status` is one of:
+      - "ok": the operation was applied;
+      - "not_found": an update or delete whose item does not exist;
+      - "unknown": a delete that may or may not have found its item (see crud.mark_unmatched);
+      - "error": the operation failed, with MongoDB's error code and message.
+    """
+    op: str
+    status: str
+    id: Optional[str] = None
+    code: Optional[int] = None
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    """
+    Totals of a bulk request, and the outcome of each of its operations.
+    `matched` counts the updates that found their item, `modified` those that changed it.
+    """
+    inserted: int = 0
+    matched: int = 0
+    modified: int = 0
+    deleted: int = 0
+    results: list[BulkOperationResult] = []
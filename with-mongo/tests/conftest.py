@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+import types
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+# The app's modules import each other relatively, as a package, but this
+# directory's name is not a valid identifier: register it under one.
+APP_DIR = Path(__file__).resolve().parent.parent
+package = types.ModuleType("with_mongo")
+package.__path__ = [str(APP_DIR)]
+sys.modules.setdefault("with_mongo", package)
+
+from with_mongo import crud, crud_async, database  # noqa: E402
+from with_mongo.cache import ItemCache  # noqa: E402
+
+# The tests need a running MongoDB (e.g. `docker compose up mongo`); they are
+# skipped when none is reachable. They work in a database of their own.
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
+TEST_DATABASE = "fastapi_mongo_crud_test"
+
+
+class CommandCounter(monitoring.CommandListener):
+    """
+    Counts the commands sent by the clients it is registered with, by command name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def started(self, event):
+        with self._lock:
+            self._counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def take(self) -> Counter:
+        """
+        Return the commands counted since the last call, and start counting afresh.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+
+def connect(client_class, counter: CommandCounter):
+    return client_class(MONGO_URL, serverSelectionTimeoutMS=2000, event_listeners=[counter])
+
+
+@pytest.fixture(scope="session")
+def mongo_available():
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"MongoDB is not reachable at {MONGO_URL}")
+    finally:
+        client.close()
+
+
+@pytest.fixture
+def no_item_cache(monkeypatch):
+    # Reads by ID must reach the database to be counted.
+    disabled = ItemCache(0, 0)
+    monkeypatch.setattr(crud, "item_cache", disabled)
+    monkeypatch.setattr(crud_async, "item_cache", disabled)
+
+
+@pytest.fixture
+def commands(mongo_available, monkeypatch, no_item_cache):
+    """
+    Point the synchronous crud module at an empty test database, and count the commands it sends there.
+    """
+    counter = CommandCounter()
+    client = connect(MongoClient, counter)
+    client.drop_database(TEST_DATABASE)
+    monkeypatch.setattr(database, "collection", client[TEST_DATABASE][database.COLLECTION_NAME])
+    counter.take()
+    yield counter
+    client.drop_database(TEST_DATABASE)
+    client.close()
+
+
+@pytest.fixture
+def async_commands(commands, monkeypatch):
+    """
+    Like `commands`, for the motor-based crud_async module. Returns a function
+    that connects motor on the running event loop and returns its counter.
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    def connect_async() -> CommandCounter:
+        counter = CommandCounter()
+        monkeypatch.setattr(database, "async_client", connect(AsyncIOMotorClient, counter))
+        return counter
+
+    # The motor client looks its collection up by name: use the test database there too.
+    monkeypatch.setattr(database, "DATABASE_NAME", TEST_DATABASE)
+
+    return connect_async
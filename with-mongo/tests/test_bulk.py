@@ -0,0 +1,47 @@
+from bson import ObjectId
+
+from with_mongo import crud, schemas
+
+ITEM = schemas.ItemCreate(name="Widget", price=9.5)
+
+
+def update(item_id: str) -> schemas.BulkUpdate:
+    return schemas.BulkUpdate(op="update", id=item_id, item=ITEM)
+
+
+def delete(item_id: str) -> schemas.BulkDelete:
+    return schemas.BulkDelete(op="delete", id=item_id)
+
+
+def statuses(response: schemas.BulkResponse) -> list[str]:
+    return [result.status for result in response.results]
+
+
+def test_matched_updates_and_deletes_are_ok(commands):
+    first, second = crud.create_item(ITEM), crud.create_item(ITEM)
+    commands.take()
+    response = crud.bulk_write_items([update(first.id), delete(second.id)])
+    assert statuses(response) == ["ok", "ok"]
+    assert commands.take() == {"update": 1, "delete": 1}
+
+
+def test_unmatched_updates_and_deletes_are_not_found(commands):
+    response = crud.bulk_write_items([update(str(ObjectId())), delete(str(ObjectId()))])
+    assert statuses(response) == ["not_found", "not_found"]
+    assert (response.matched, response.deleted) == (0, 0)
+    assert commands.take() == {"update": 1, "delete": 1}
+
+
+def test_partly_matched_updates_are_told_apart_with_one_query(commands):
+    existing = crud.create_item(ITEM)
+    commands.take()
+    response = crud.bulk_write_items([update(str(ObjectId())), update(existing.id)])
+    assert statuses(response) == ["not_found", "ok"]
+    assert commands.take() == {"update": 1, "find": 1}
+
+
+def test_partly_matched_deletes_are_unknown(commands):
+    existing = crud.create_item(ITEM)
+    response = crud.bulk_write_items([delete(existing.id), delete(str(ObjectId()))])
+    assert statuses(response) == ["unknown", "unknown"]
+    assert response.deleted == 1
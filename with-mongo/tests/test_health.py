@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from bson.errors import InvalidId
+from pymongo.errors import AutoReconnect, DuplicateKeyError, OperationFailure
+
+from with_mongo import main
+from with_mongo.health import CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def half_open(monkeypatch):
+    """
+    A circuit breaker whose reset timeout has passed, so it lets one trial call through.
+    """
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.open()
+    breaker._opened_at -= 60
+    monkeypatch.setattr(main, "breaker", breaker)
+    return breaker
+
+
+def call_raising(error: BaseException):
+    def crud_call():
+        raise error
+
+    async def call():
+        return await main.call_crud(crud_call)
+
+    with pytest.raises(type(error)):
+        asyncio.run(call())
+
+
+def test_success_closes_the_breaker(half_open):
+    assert asyncio.run(main.call_crud(lambda: "ok")) == "ok"
+    assert half_open.state == CircuitBreaker.CLOSED
+
+
+def test_connection_failure_reopens_the_breaker(half_open):
+    call_raising(AutoReconnect("connection reset"))
+    assert half_open.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        half_open.before_call()
+
+
+@pytest.mark.parametrize("error", [DuplicateKeyError("duplicate key"), OperationFailure("bad query")])
+def test_other_database_errors_close_the_breaker(half_open, error):
+    call_raising(error)
+    assert half_open.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("error", [InvalidId("not an ObjectId"), asyncio.CancelledError()])
+def test_errors_that_never_reached_the_database_free_the_trial(half_open, error):
+    call_raising(error)
+    assert half_open.state == CircuitBreaker.HALF_OPEN
+    # Another request may try the database right away, instead of waiting for reset_timeout.
+    half_open.before_call()
+
+
+def test_streamed_responses_report_to_the_breaker(half_open):
+    async def chunks():
+        raise AutoReconnect("connection reset")
+        yield b""
+
+    async def consume():
+        return [chunk async for chunk in main.guarded_chunks(chunks())]
+
+    half_open.before_call()
+    with pytest.raises(AutoReconnect):
+        asyncio.run(consume())
+    assert half_open.state == CircuitBreaker.OPEN
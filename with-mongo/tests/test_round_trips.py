@@ -0,0 +1,92 @@
+import asyncio
+
+from bson import ObjectId
+
+from with_mongo import crud, crud_async, schemas
+
+# Every CRUD call must cost exactly the commands listed here: an extra
+# find after a write, say, is a round trip added to every request.
+
+ITEM = schemas.ItemCreate(name="Widget", description="A widget", price=9.5, tax=0.5)
+OTHER = schemas.ItemCreate(name="Gadget", price=3)
+
+
+def test_create_item_sends_one_insert(commands):
+    item = crud.create_item(ITEM)
+    assert commands.take() == {"insert": 1}
+    assert item.name == ITEM.name and item.id
+
+
+def test_insert_items_sends_one_insert(commands):
+    assert crud.insert_items([ITEM.model_dump() for _ in range(10)]) == {}
+    assert commands.take() == {"insert": 1}
+
+
+def test_get_item_sends_one_find(commands):
+    created = crud.create_item(ITEM)
+    commands.take()
+    assert crud.get_item(created.id) == created
+    assert commands.take() == {"find": 1}
+    assert crud.get_item(str(ObjectId())) is None
+    assert commands.take() == {"find": 1}
+
+
+def test_get_items_sends_one_find(commands):
+    for _ in range(3):
+        crud.create_item(ITEM)
+    commands.take()
+    assert len(crud.get_items(limit=10)) == 3
+    assert commands.take() == {"find": 1}
+
+
+def test_update_item_sends_one_find_and_modify(commands):
+    created = crud.create_item(ITEM)
+    commands.take()
+    updated = crud.update_item(created.id, OTHER)
+    assert commands.take() == {"findAndModify": 1}
+    assert updated.id == created.id and updated.name == OTHER.name
+
+
+def test_update_missing_item_reports_it(commands):
+    assert crud.update_item(str(ObjectId()), OTHER) is None
+    assert commands.take() == {"findAndModify": 1}
+
+
+def test_delete_item_sends_one_delete(commands):
+    created = crud.create_item(ITEM)
+    commands.take()
+    assert crud.delete_item(created.id) is True
+    assert commands.take() == {"delete": 1}
+    assert crud.delete_item(created.id) is False
+    assert commands.take() == {"delete": 1}
+
+
+def test_bulk_write_sends_one_command_per_kind(commands):
+    first, second = crud.create_item(ITEM), crud.create_item(ITEM)
+    commands.take()
+    operations = [
+        schemas.BulkInsert(op="insert", item=ITEM),
+        schemas.BulkInsert(op="insert", item=OTHER),
+        schemas.BulkUpdate(op="update", id=first.id, item=OTHER),
+        schemas.BulkDelete(op="delete", id=second.id),
+    ]
+    response = crud.bulk_write_items(operations)
+    assert commands.take() == {"insert": 1, "update": 1, "delete": 1}
+    assert (response.inserted, response.modified, response.deleted) == (2, 1, 1)
+
+
+def test_async_crud_sends_one_command_per_call(async_commands):
+    async def scenario():
+        commands = async_commands()
+        created = await crud_async.create_item(ITEM)
+        assert commands.take() == {"insert": 1}
+        assert await crud_async.get_item(created.id) == created
+        assert commands.take() == {"find": 1}
+        assert (await crud_async.update_item(created.id, OTHER)).name == OTHER.name
+        assert commands.take() == {"findAndModify": 1}
+        assert await crud_async.update_item(str(ObjectId()), OTHER) is None
+        assert commands.take() == {"findAndModify": 1}
+        assert await crud_async.delete_item(created.id) is True
+        assert commands.take() == {"delete": 1}
+
+    asyncio.run(scenario())
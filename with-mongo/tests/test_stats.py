@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from with_mongo import crud, crud_async, main, schemas
+from with_mongo.cache import ItemCache
+
+BANDS = [0, 10, 100]
+ITEMS = [
+    schemas.ItemCreate(name="Apple", price=5, tax=1),
+    schemas.ItemCreate(name="Apricot", price=15),
+    schemas.ItemCreate(name="Banana", price=25, tax=2.5),
+    schemas.ItemCreate(name="Boat", price=150, tax=15),
+]
+
+
+@pytest.fixture
+def stats(commands, monkeypatch):
+    """
+    The crud modules on an empty test database, with stats computed afresh on every call.
+    """
+    disabled = ItemCache(0, 0)
+    monkeypatch.setattr(crud, "stats_cache", disabled)
+    monkeypatch.setattr(crud_async, "stats_cache", disabled)
+    return commands
+
+
+def band(result: schemas.ItemStats, min_price) -> schemas.PriceBand:
+    (found,) = [price_band for price_band in result.bands if price_band.min_price == min_price]
+    return found
+
+
+def test_totals_and_bands(stats):
+    for item in ITEMS:
+        crud.create_item(item)
+    stats.take()
+    result = crud.get_item_stats(schemas.ItemFilter(), BANDS)
+    # $facet computes the totals and the bands in one aggregation.
+    assert stats.take() == {"aggregate": 1}
+
+    assert result.count == 4
+    assert result.total_price == 195
+    assert result.average_price == 48.75
+    assert (result.min_price, result.max_price) == (5, 150)
+    assert result.average_tax == pytest.approx(18.5 / 3)
+    assert result.total_tax == 18.5
+    assert result.total_with_tax == 213.5
+
+    assert len(result.bands) == 3
+    assert band(result, 0) == schemas.PriceBand(min_price=0, max_price=10, count=1, total_price=5, total_with_tax=6)
+    assert band(result, 10) == schemas.PriceBand(
+        min_price=10, max_price=100, count=2, total_price=40, total_with_tax=42.5
+    )
+    # Items priced outside the bands are counted in a band without bounds.
+    assert band(result, None) == schemas.PriceBand(count=1, total_price=150, total_with_tax=165)
+
+
+def test_empty_collection(stats):
+    assert crud.get_item_stats(schemas.ItemFilter(), BANDS) == schemas.ItemStats()
+
+
+def test_filters(stats):
+    for item in ITEMS:
+        crud.create_item(item)
+    result = crud.get_item_stats(schemas.ItemFilter(name_prefix="Ap", max_price=20), BANDS)
+    assert (result.count, result.total_price, result.total_tax) == (2, 20, 1)
+    assert result.average_tax == 1
+    assert [(price_band.min_price, price_band.count) for price_band in result.bands] == [(0, 1), (10, 1)]
+
+    assert crud.get_item_stats(schemas.ItemFilter(has_tax=False), BANDS).count == 1
+    assert crud.get_item_stats(schemas.ItemFilter(min_price=1000), BANDS) == schemas.ItemStats()
+
+
+def test_async_stats_match(stats, async_commands):
+    for item in ITEMS:
+        crud.create_item(item)
+
+    async def scenario():
+        commands = async_commands()
+        result = await crud_async.get_item_stats(schemas.ItemFilter(min_price=10), BANDS)
+        assert commands.take() == {"aggregate": 1}
+        return result
+
+    assert asyncio.run(scenario()) == crud.get_item_stats(schemas.ItemFilter(min_price=10), BANDS)
+
+
+def test_stats_route(stats):
+    for item in ITEMS:
+        crud.create_item(item)
+    client = TestClient(main.app)
+    response = client.get("/items/_stats", params={"has_tax": "true", "bands": "0,10,100"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["count"], body["total_price"]) == (3, 180)
+    bands = [(price_band["min_price"], price_band["count"]) for price_band in body["bands"]]
+    assert bands == [(0, 1), (10, 1), (None, 1)]
+    assert client.get("/items/_stats", params={"bands": "10,0"}).status_code == 400
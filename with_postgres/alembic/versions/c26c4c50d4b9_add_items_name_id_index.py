@@ -0,0 +1,29 @@
+"""add items name id index
+
+Composite index on items (name, id), used to page through items ordered
+by name with a keyset (WHERE (name, id) > (:name, :id)) instead of OFFSET.
+
+Revision ID: c26c4c50d4b9
+Revises:
+Create Date: 2026-10-18 04:43:37.820400
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c26c4c50d4b9"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases created since the index was added to the model already have it.
+    op.create_index("ix_items_name_id", "items", ["name", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_items_name_id", table_name="items")
@@ -0,0 +1,100 @@
+"""
+Bulk Ingest
+
+Reading and validation of the rows sent to POST /items/_bulk and /posts/_bulk.
+
+The request body is either a JSON array of rows, or NDJSON (one JSON object
+per line, with an `application/x-ndjson` content type). NDJSON is parsed as
+it streams in, so a large upload never has to be held in memory at once.
+Rows are validated against the endpoint's schema in batches; each batch is
+then written in its own transaction (see crud.create_items/create_posts).
+"""
+
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from .schemas import RejectedRow
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+@dataclass
+class Batch:
+    """
+    The valid rows of a batch with their positions in the request body, and the rejected ones.
+    """
+
+    indexes: list[int] = field(default_factory=list)
+    rows: list[BaseModel] = field(default_factory=list)
+    rejected: list[RejectedRow] = field(default_factory=list)
+
+
+def is_ndjson(request: Request) -> bool:
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return media_type in NDJSON_MEDIA_TYPES
+
+
+async def ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """
+    Yield the lines of the request body as its chunks arrive.
+    """
+    pending = b""
+    async for chunk in request.stream():
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    yield pending
+
+
+async def request_rows(request: Request) -> AsyncIterator[object]:
+    """
+    Yield the rows of the request body, skipping blank NDJSON lines.
+    An NDJSON line that is not valid JSON is yielded as its JSONDecodeError.
+    """
+    if not is_ndjson(request):
+        try:
+            rows = json.loads(await request.body())
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of rows")
+        for row in rows:
+            yield row
+        return
+    async for line in ndjson_lines(request):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield e
+
+
+async def validated_batches(
+    rows: AsyncIterator[object], schema: type[BaseModel], batch_size: int
+) -> AsyncIterator[Batch]:
+    """
+    Validate `rows` against `schema`, and yield them `batch_size` rows at a time.
+    """
+    batch = Batch()
+    index = 0
+    async for row in rows:
+        if isinstance(row, json.JSONDecodeError):
+            batch.rejected.append(RejectedRow(index=index, errors=[{"type": "json_invalid", "msg": str(row)}]))
+        else:
+            try:
+                batch.rows.append(schema.model_validate(row))
+                batch.indexes.append(index)
+            except ValidationError as e:
+                batch.rejected.append(RejectedRow(index=index, errors=e.errors(include_url=False, include_input=False)))
+        index += 1
+        if index % batch_size == 0:
+            yield batch
+            batch = Batch()
+    if batch.rows or batch.rejected:
+        yield batch
@@ -8,6 +8,12 @@ class Settings(BaseSettings):
     )
     api_version: str
     database_url: str
+    # Serve requests with an async engine and AsyncSession instead of the sync ones.
+    async_db: bool = False
+    # Rows validated and written per transaction by the bulk ingest endpoints.
+    bulk_batch_size: int = 5000
+    # Rows fetched per round trip from the server-side cursor of the export endpoints.
+    export_batch_size: int = 1000
 
 
 settings = Settings()
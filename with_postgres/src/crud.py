@@ -1,29 +1,166 @@
+from psycopg import sql
+from pydantic import BaseModel
+from sqlalchemy import Integer, delete, insert, select, tuple_, update
 from sqlalchemy.orm import Session
 
 from .models import Item, Post  # Added Item
 from .schemas import ItemBase, ItemCreate, PostCreate  # Added ItemCreate, ItemBase (for update)
 
+# Writes are single INSERT/UPDATE/DELETE ... RETURNING statements: the
+# returned row carries every column of PostResponse/ItemResponse, so nothing
+# has to be read back afterwards. The statements are built here and shared
+# with crud_async.py.
+POST_COLUMNS = (Post.id, Post.title, Post.content)
+ITEM_COLUMNS = (Item.id, Item.name, Item.description, Item.price, Item.tax)
+
+
+def create_post_statement(post: PostCreate):
+    """
+    Builds the INSERT ... RETURNING statement that creates a post and returns its row.
+    """
+    return insert(Post).values(title=post.title, content=post.content).returning(*POST_COLUMNS)
+
+def create_item_statement(item: ItemCreate):
+    """
+    Builds the INSERT ... RETURNING statement that creates an item and returns its row.
+    """
+    return (
+        insert(Item)
+        .values(name=item.name, description=item.description, price=item.price, tax=item.tax)
+        .returning(*ITEM_COLUMNS)
+    )
+
+def update_item_statement(item_id: int, item: ItemBase):
+    """
+    Builds the UPDATE ... RETURNING statement that changes an item's fields.
+    Only the fields set in `item` are changed; no row is returned if no item has that ID.
+    """
+    return (
+        update(Item)
+        .where(Item.id == item_id)
+        .values(**item.model_dump(exclude_unset=True))
+        .returning(*ITEM_COLUMNS)
+        # No Item objects are loaded in the session, so there is nothing to keep in sync.
+        .execution_options(synchronize_session=False)
+    )
+
+def delete_item_statement(item_id: int):
+    """
+    Builds the DELETE ... RETURNING statement that removes an item and returns its ID,
+    or no row if no item has that ID.
+    """
+    return delete(Item).where(Item.id == item_id).returning(Item.id).execution_options(synchronize_session=False)
+
+# Listings are ordered, so pages are stable. To get the next page, pass the
+# last row's ID as `after_id` (and its name as `after_name` when ordering
+# items by name): the database then seeks straight to it through an index,
+# where `skip` would make it read and discard every skipped row.
+
+def posts_statement(skip: int = 0, limit: int = 100, after_id: int | None = None):
+    """
+    Builds the query for a page of posts in ID order, starting after `after_id`
+    if given, with an offset and limit for pagination.
+    """
+    statement = select(Post)
+    if after_id is not None:
+        statement = statement.where(Post.id > after_id)
+    if skip:
+        statement = statement.offset(skip)
+    return statement.order_by(Post.id).limit(limit)
+
+def items_statement(
+    skip: int = 0, limit: int = 100, after_id: int | None = None, after_name: str | None = None, order: str = "id"
+):
+    """
+    Builds the query for a page of items, ordered by ID or by name (`order`).
+    When ordering by name, `after_id` and `after_name` must be given together:
+    the page then starts after that (name, id) pair.
+    """
+    statement = select(Item)
+    if order == "name":
+        # Served by the ix_items_name_id index; the ID breaks ties between equal names.
+        if after_id is not None:
+            statement = statement.where(tuple_(Item.name, Item.id) > tuple_(after_name, after_id))
+        statement = statement.order_by(Item.name, Item.id)
+    else:
+        if after_id is not None:
+            statement = statement.where(Item.id > after_id)
+        statement = statement.order_by(Item.id)
+    if skip:
+        statement = statement.offset(skip)
+    return statement.limit(limit)
+
+
+# Bulk ingest writes all the rows of a batch in one command: PostgreSQL's
+# COPY ... FROM STDIN when the database is reached through psycopg, or a
+# single executemany INSERT otherwise (SQLite).
+POST_COPY_COLUMNS = ("title", "content")
+ITEM_COPY_COLUMNS = ("name", "description", "price", "tax")
+
+
+def uses_copy(db) -> bool:
+    """
+    Whether `db` is connected through psycopg, so that bulk ingest can use COPY.
+    """
+    return db.get_bind().dialect.driver in ("psycopg", "psycopg_async")
+
+def copy_statement(model, columns: tuple[str, ...]):
+    """
+    Builds the COPY ... FROM STDIN statement that loads `columns` of `model`'s table.
+    """
+    return sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(model.__tablename__), sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+
+def copy_rows(model, columns: tuple[str, ...], rows: list[BaseModel]):
+    """
+    Yields the values of each row for a COPY of `columns`.
+    """
+    # Unlike INSERT, COPY does not cast: a float sent for an Integer column
+    # (like items.price) is an error instead of being rounded, so round it here.
+    # An INSERT converts it with PostgreSQL's float8-to-integer cast, which
+    # rounds halves to even (2.5 -> 2, 3.5 -> 4), and so does round(): both
+    # paths store the same value (see tests/test_postgres.py).
+    integer_columns = {name for name in columns if isinstance(model.__table__.c[name].type, Integer)}
+    for row in rows:
+        values = row.model_dump()
+        yield tuple(
+            round(values[name]) if name in integer_columns and isinstance(values[name], float) else values[name]
+            for name in columns
+        )
+
 
 def create_post(db: Session, post: PostCreate):
     """
     Creates a new post in the database.
-    This function takes a PostCreate schema, converts it to a Post ORM model,
-    adds it to the session, commits the transaction, and refreshes the object
-    to load any database-generated fields (like the ID).
+    This function inserts the post with a single INSERT ... RETURNING statement,
+    commits the transaction, and returns the inserted row, including
+    database-generated fields (like the ID).
     """
-    db_post = Post(title=post.title, content=post.content)
-    db.add(db_post)
+    db_post = db.execute(create_post_statement(post)).one()
     db.commit()
-    db.refresh(db_post)
     return db_post
 
-def get_posts(db: Session, skip: int = 0, limit: int = 100):
+def create_posts(db: Session, posts: list[PostCreate]) -> int:
+    """
+    Inserts several posts in one transaction and returns how many were inserted.
+    """
+    return bulk_create(db, Post, POST_COPY_COLUMNS, posts)
+
+def export_posts(db: Session, batch_size: int):
+    """
+    Yields all posts in ID order as lists of up to `batch_size` rows (see export_rows).
+    """
+    return export_rows(db, POST_COLUMNS, batch_size)
+
+def get_posts(db: Session, skip: int = 0, limit: int = 100, after_id: int | None = None):
     """
     Retrieves a list of posts from the database with optional pagination.
-    This function queries the database for Post objects, applying an offset
-    and limit for pagination, and returns the results.
+    This function queries the database for Post objects in ID order, starting
+    after `after_id` if given, applying an offset and limit for pagination,
+    and returns the results.
     """
-    return db.query(Post).offset(skip).limit(limit).all()
+    return db.scalars(posts_statement(skip, limit, after_id)).all()
 
 # --- Item CRUD Operations ---
 
@@ -31,42 +168,83 @@ def create_item(db: Session, item: ItemCreate):
     """
     Creates a new item in the database.
     """
-    db_item = Item(name=item.name, description=item.description, price=item.price, tax=item.tax)
-    db.add(db_item)
+    db_item = db.execute(create_item_statement(item)).one()
     db.commit()
-    db.refresh(db_item)
     return db_item
 
+def create_items(db: Session, items: list[ItemCreate]) -> int:
+    """
+    Inserts several items in one transaction and returns how many were inserted.
+    """
+    return bulk_create(db, Item, ITEM_COPY_COLUMNS, items)
+
+def bulk_create(db: Session, model, columns: tuple[str, ...], rows: list[BaseModel]) -> int:
+    """
+    Writes `rows` with COPY or an executemany INSERT (see uses_copy), then commits.
+    On failure the transaction is rolled back, so the session can go on with the next batch.
+    """
+    try:
+        if uses_copy(db):
+            with db.connection().connection.driver_connection.cursor() as cursor:
+                with cursor.copy(copy_statement(model, columns)) as copy:
+                    for values in copy_rows(model, columns, rows):
+                        copy.write_row(values)
+        else:
+            db.execute(insert(model), [row.model_dump() for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
 def get_item(db: Session, item_id: int):
     """
     Retrieves a single item by its ID.
     """
     return db.query(Item).filter(Item.id == item_id).first()
 
-def get_items(db: Session, skip: int = 0, limit: int = 100):
+def get_items(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: int | None = None,
+    after_name: str | None = None,
+    order: str = "id",
+):
+    """
+    Retrieves a list of items with optional pagination, ordered by ID or by name.
+    """
+    return db.scalars(items_statement(skip, limit, after_id, after_name, order)).all()
+
+def export_items(db: Session, batch_size: int):
     """
-    Retrieves a list of items with optional pagination.
+    Yields all items in ID order as lists of up to `batch_size` rows (see export_rows).
     """
-    return db.query(Item).offset(skip).limit(limit).all()
+    return export_rows(db, ITEM_COLUMNS, batch_size)
+
+def export_rows(db: Session, columns: tuple, batch_size: int):
+    """
+    Reads `columns` through a server-side cursor, `batch_size` rows per round
+    trip, and yields each batch as plain Core rows, without loading ORM objects.
+    The first column is the primary key, which gives the order.
+    """
+    statement = select(*columns).order_by(columns[0]).execution_options(yield_per=batch_size)
+    yield from db.execute(statement).partitions()
 
 def update_item(db: Session, item_id: int, item: ItemBase):
     """
     Updates an existing item in the database.
+    Returns the updated row, or None if no item has that ID.
     """
-    db_item = db.query(Item).filter(Item.id == item_id).first()
-    if db_item:
-        for key, value in item.model_dump(exclude_unset=True).items():
-            setattr(db_item, key, value)
-        db.commit()
-        db.refresh(db_item)
+    db_item = db.execute(update_item_statement(item_id, item)).first()
+    db.commit()
     return db_item
 
 def delete_item(db: Session, item_id: int):
     """
     Deletes an item from the database.
+    Returns the deleted item's ID row, or None if no item has that ID.
     """
-    db_item = db.query(Item).filter(Item.id == item_id).first()
-    if db_item:
-        db.delete(db_item)
-        db.commit()
+    db_item = db.execute(delete_item_statement(item_id)).first()
+    db.commit()
     return db_item
\ No newline at end of file
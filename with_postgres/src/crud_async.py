@@ -0,0 +1,155 @@
+"""
+Async counterparts of the functions in crud.py, for use with an AsyncSession.
+They are used when ASYNC_DB is enabled, so requests wait on the database
+without holding a thread-pool thread.
+"""
+
+from pydantic import BaseModel
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .crud import (
+    ITEM_COLUMNS,
+    ITEM_COPY_COLUMNS,
+    POST_COLUMNS,
+    POST_COPY_COLUMNS,
+    copy_rows,
+    copy_statement,
+    create_item_statement,
+    create_post_statement,
+    delete_item_statement,
+    items_statement,
+    posts_statement,
+    update_item_statement,
+    uses_copy,
+)
+from .models import Item, Post
+from .schemas import ItemBase, ItemCreate, PostCreate
+
+
+async def create_post(db: AsyncSession, post: PostCreate):
+    """
+    Creates a new post in the database.
+    """
+    db_post = (await db.execute(create_post_statement(post))).one()
+    await db.commit()
+    return db_post
+
+
+async def create_posts(db: AsyncSession, posts: list[PostCreate]) -> int:
+    """
+    Inserts several posts in one transaction and returns how many were inserted.
+    """
+    return await bulk_create(db, Post, POST_COPY_COLUMNS, posts)
+
+
+def export_posts(db: AsyncSession, batch_size: int):
+    """
+    Yields all posts in ID order as lists of up to `batch_size` rows (see export_rows).
+    """
+    return export_rows(db, POST_COLUMNS, batch_size)
+
+
+async def get_posts(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int | None = None):
+    """
+    Retrieves a list of posts from the database with optional pagination.
+    """
+    return (await db.scalars(posts_statement(skip, limit, after_id))).all()
+
+
+# --- Item CRUD Operations ---
+
+
+async def create_item(db: AsyncSession, item: ItemCreate):
+    """
+    Creates a new item in the database.
+    """
+    db_item = (await db.execute(create_item_statement(item))).one()
+    await db.commit()
+    return db_item
+
+
+async def create_items(db: AsyncSession, items: list[ItemCreate]) -> int:
+    """
+    Inserts several items in one transaction and returns how many were inserted.
+    """
+    return await bulk_create(db, Item, ITEM_COPY_COLUMNS, items)
+
+
+async def bulk_create(db: AsyncSession, model, columns: tuple[str, ...], rows: list[BaseModel]) -> int:
+    """
+    Writes `rows` with COPY or an executemany INSERT (see crud.uses_copy), then commits.
+    On failure the transaction is rolled back, so the session can go on with the next batch.
+    """
+    try:
+        if uses_copy(db):
+            connection = await (await db.connection()).get_raw_connection()
+            async with connection.driver_connection.cursor() as cursor:
+                async with cursor.copy(copy_statement(model, columns)) as copy:
+                    for values in copy_rows(model, columns, rows):
+                        await copy.write_row(values)
+        else:
+            await db.execute(insert(model), [row.model_dump() for row in rows])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return len(rows)
+
+
+async def get_item(db: AsyncSession, item_id: int):
+    """
+    Retrieves a single item by its ID.
+    """
+    return await db.get(Item, item_id)
+
+
+async def get_items(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: int | None = None,
+    after_name: str | None = None,
+    order: str = "id",
+):
+    """
+    Retrieves a list of items with optional pagination, ordered by ID or by name.
+    """
+    return (await db.scalars(items_statement(skip, limit, after_id, after_name, order))).all()
+
+
+def export_items(db: AsyncSession, batch_size: int):
+    """
+    Yields all items in ID order as lists of up to `batch_size` rows (see export_rows).
+    """
+    return export_rows(db, ITEM_COLUMNS, batch_size)
+
+
+async def export_rows(db: AsyncSession, columns: tuple, batch_size: int):
+    """
+    Async counterpart of crud.export_rows, streaming from a server-side cursor.
+    """
+    statement = select(*columns).order_by(columns[0]).execution_options(yield_per=batch_size)
+    result = await db.stream(statement)
+    async for rows in result.partitions():
+        yield rows
+
+
+async def update_item(db: AsyncSession, item_id: int, item: ItemBase):
+    """
+    Updates an existing item in the database.
+    Returns the updated row, or None if no item has that ID.
+    """
+    db_item = (await db.execute(update_item_statement(item_id, item))).first()
+    await db.commit()
+    return db_item
+
+
+async def delete_item(db: AsyncSession, item_id: int):
+    """
+    Deletes an item from the database.
+    Returns the deleted item's ID row, or None if no item has that ID.
+    """
+    db_item = (await db.execute(delete_item_statement(item_id))).first()
+    await db.commit()
+    return db_item
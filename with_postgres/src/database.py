@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -14,6 +16,29 @@ engine = create_engine(settings.database_url)
 # This provides transaction isolation for each request.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """
+    Returns the URL of the same database for an async driver:
+    psycopg's async mode for PostgreSQL, aiosqlite for SQLite.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        parsed = parsed.set(drivername="postgresql+psycopg")
+    elif parsed.get_backend_name() == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# With ASYNC_DB enabled, requests use an async engine on the same database.
+# The sync engine is still created, for table creation and migrations.
+async_engine = None
+AsyncSessionLocal = None
+if settings.async_db:
+    async_engine = create_async_engine(async_database_url(settings.database_url))
+    # Objects stay usable after commit without another (async) load.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base is the base class for our declarative models.
 # All SQLAlchemy models will inherit from this Base.
 Base = declarative_base()
@@ -30,3 +55,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Async counterpart of get_db, providing an AsyncSession for a single request.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,57 @@
+"""
+Streaming export of posts and items as NDJSON or CSV.
+
+Rows come in batches from a server-side cursor (see crud.export_posts and
+crud.export_items) as plain Core rows; each batch is encoded as soon as it
+arrives, without building ORM objects or response models, so an export of
+any size is sent as a stream in constant memory.
+"""
+
+import csv
+import io
+import json
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def encode_rows(rows, names: list[str], format: str) -> bytes:
+    """
+    Encode a batch of rows as NDJSON lines, or CSV records.
+    """
+    if format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+    return "".join(json.dumps(dict(zip(names, row))) + "\n" for row in rows).encode()
+
+
+def header(names: list[str], format: str) -> bytes:
+    """
+    The CSV header line; NDJSON has none.
+    """
+    if format == "csv":
+        return encode_rows([names], names, format)
+    return b""
+
+
+def export_chunks(batches, columns, format: str):
+    """
+    Encode the row batches of a sync crud export, one chunk per batch.
+    """
+    names = [column.key for column in columns]
+    yield header(names, format)
+    for rows in batches:
+        yield encode_rows(rows, names, format)
+
+
+async def export_chunks_async(batches, columns, format: str):
+    """
+    Same as export_chunks(), for the row batches of an async crud export.
+    """
+    names = [column.key for column in columns]
+    yield header(names, format)
+    async for rows in batches:
+        yield encode_rows(rows, names, format)
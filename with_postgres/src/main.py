@@ -1,20 +1,47 @@
 from datetime import datetime, timezone
-
-from fastapi import Depends, FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from typing import Literal
+
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from psycopg import Error as PsycopgError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from . import models
-from .crud import create_item, create_post, delete_item, get_item, get_items, get_posts, update_item  # Import Item CRUD
-from .database import engine, get_db
+from . import bulk, crud, crud_async, export, models
+from .config import settings
+from .database import async_engine, engine, get_async_db, get_db
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
 
-from .schemas import ItemBase, ItemCreate, ItemResponse, PostCreate, PostResponse  # Import Item schemas  # noqa: E402
+from .schemas import (  # noqa: E402
+    BulkIngestResponse,
+    ItemBase,
+    ItemCreate,
+    ItemResponse,
+    PostCreate,
+    PostResponse,
+    RejectedRow,
+)
 
 app = FastAPI()
 
+# With ASYNC_DB enabled the endpoints await the async crud functions on an
+# AsyncSession; otherwise the sync ones run in the thread pool on a Session.
+db_crud = crud_async if settings.async_db else crud
+get_session = get_async_db if settings.async_db else get_db
+
+
+async def call_crud(func, *args, **kwargs):
+    """
+    Await an async crud function, or run a sync one in the thread pool.
+    """
+    if settings.async_db:
+        return await func(*args, **kwargs)
+    return await run_in_threadpool(func, *args, **kwargs)
+
 
 @app.on_event("startup")
 async def startup_db_client():
@@ -30,6 +57,51 @@ async def shutdown_db_client():
     # SQLAlchemy manages connection pooling, so explicit engine disposal is often not strictly necessary
     # for simple cases but can be added for explicit control or complex scenarios.
     print("Disconnecting from database...")
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def set_next_page_link(request: Request, response: Response, page: list, limit: int, **cursor):
+    """
+    When a page is full, point the Link header at the next one: the same query
+    with `cursor` (the keyset of the page's last row) instead of `skip`.
+    """
+    if page and len(page) == limit:
+        next_url = request.url.remove_query_params("skip").include_query_params(**cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+
+async def ingest_rows(request: Request, db: Session | AsyncSession, schema, create_many) -> BulkIngestResponse:
+    """
+    Validate the rows of a bulk request in batches and write each batch with
+    `create_many`, in its own transaction. A batch the database refuses is
+    reported as rejected, and the following batches are still written.
+    """
+    result = BulkIngestResponse()
+    batches = bulk.validated_batches(bulk.request_rows(request), schema, settings.bulk_batch_size)
+    async for batch in batches:
+        result.rejected.extend(batch.rejected)
+        if not batch.rows:
+            continue
+        try:
+            result.ingested += await call_crud(create_many, db, batch.rows)
+        except (DBAPIError, PsycopgError) as e:
+            error = {"type": "database_error", "msg": str(getattr(e, "orig", None) or e).splitlines()[0]}
+            result.rejected.extend(RejectedRow(index=index, errors=[error]) for index in batch.indexes)
+    result.rejected.sort(key=lambda row: row.index)
+    return result
+
+
+def export_response(name: str, batches, columns, format: str) -> StreamingResponse:
+    """
+    Stream the row batches of a crud export as a `name`.ndjson or `name`.csv download.
+    """
+    if settings.async_db:
+        chunks = export.export_chunks_async(batches, columns, format)
+    else:
+        chunks = iterate_in_threadpool(export.export_chunks(batches, columns, format))
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    return StreamingResponse(chunks, media_type=export.MEDIA_TYPES[format], headers=headers)
 
 
 class CustomError(Exception):
@@ -52,72 +124,157 @@ async def custom_exception_handler(_request: Request, exc: CustomError):
 
 
 @app.post("/posts/", response_model=PostResponse)
-def create_post_endpoint(post: PostCreate, db: Session = Depends(get_db)):
+async def create_post_endpoint(post: PostCreate, db: Session | AsyncSession = Depends(get_session)):
     """
     API endpoint to create a new post.
     Delegates to the crud module for database interaction.
     """
-    return create_post(db=db, post=post)
+    return await call_crud(db_crud.create_post, db=db, post=post)
+
+
+@app.post("/posts/_bulk", response_model=BulkIngestResponse)
+async def bulk_create_posts_endpoint(request: Request, db: Session | AsyncSession = Depends(get_session)):
+    """
+    API endpoint to create many posts at once, from a JSON array or an NDJSON stream.
+    Returns how many posts were created, and the rows that were rejected and why.
+    """
+    return await ingest_rows(request, db, PostCreate, db_crud.create_posts)
+
+
+@app.get("/posts/_export")
+async def export_posts_endpoint(
+    format: Literal["ndjson", "csv"] = "ndjson", db: Session | AsyncSession = Depends(get_session)
+):
+    """
+    API endpoint to download every post as NDJSON or CSV, in ID order.
+    The rows are streamed from a server-side cursor as they are read.
+    """
+    batches = db_crud.export_posts(db, settings.export_batch_size)
+    return export_response("posts", batches, crud.POST_COLUMNS, format)
 
 
 @app.get("/posts/", response_model=list[PostResponse])
-def read_posts_endpoint(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_posts_endpoint(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: int | None = None,
+    db: Session | AsyncSession = Depends(get_session),
+):
     """
-    API endpoint to retrieve a list of posts.
+    API endpoint to retrieve a list of posts, in ID order.
     Delegates to the crud module for database interaction with pagination.
+    Pages are best fetched by following the `Link: <...>; rel="next"` header,
+    which passes the last post's ID as `after_id`: unlike `skip`, this costs
+    the same however deep the page is.
     """
-    return get_posts(db=db, skip=skip, limit=limit)
+    posts = await call_crud(db_crud.get_posts, db=db, skip=skip, limit=limit, after_id=after_id)
+    if posts:
+        set_next_page_link(request, response, posts, limit, after_id=posts[-1].id)
+    return posts
 
 
 @app.post("/items/", response_model=ItemResponse)
-def create_item_endpoint(item: ItemCreate, db: Session = Depends(get_db)):
+async def create_item_endpoint(item: ItemCreate, db: Session | AsyncSession = Depends(get_session)):
     """
     API endpoint to create a new item.
     Delegates to the crud module for database interaction.
     """
-    return create_item(db=db, item=item)
+    return await call_crud(db_crud.create_item, db=db, item=item)
+
+
+@app.post("/items/_bulk", response_model=BulkIngestResponse)
+async def bulk_create_items_endpoint(request: Request, db: Session | AsyncSession = Depends(get_session)):
+    """
+    API endpoint to create many items at once, from a JSON array or an NDJSON stream.
+    Returns how many items were created, and the rows that were rejected and why.
+    """
+    return await ingest_rows(request, db, ItemCreate, db_crud.create_items)
+
+
+@app.get("/items/_export")
+async def export_items_endpoint(
+    format: Literal["ndjson", "csv"] = "ndjson", db: Session | AsyncSession = Depends(get_session)
+):
+    """
+    API endpoint to download every item as NDJSON or CSV, in ID order.
+    The rows are streamed from a server-side cursor as they are read.
+    """
+    batches = db_crud.export_items(db, settings.export_batch_size)
+    return export_response("items", batches, crud.ITEM_COLUMNS, format)
 
 
 @app.get("/items/", response_model=list[ItemResponse])
-def read_items_endpoint(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_items_endpoint(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    order: Literal["id", "name"] = "id",
+    after_id: int | None = None,
+    after_name: str | None = None,
+    db: Session | AsyncSession = Depends(get_session),
+):
     """
-    API endpoint to retrieve a list of items.
+    API endpoint to retrieve a list of items, ordered by ID or by name.
     Delegates to the crud module for database interaction with pagination.
+    Pages are best fetched by following the `Link: <...>; rel="next"` header,
+    which passes the last item's ID (and name, when ordering by name) as
+    `after_id` (and `after_name`).
     """
-    return get_items(db=db, skip=skip, limit=limit)
+    if order != "name" and after_name is not None:
+        raise HTTPException(status_code=400, detail="after_name is only used when ordering by name")
+    if order == "name" and (after_id is None) != (after_name is None):
+        raise HTTPException(status_code=400, detail="after_id and after_name go together when ordering by name")
+    items = await call_crud(
+        db_crud.get_items,
+        db=db,
+        skip=skip,
+        limit=limit,
+        after_id=after_id,
+        after_name=after_name,
+        order=order,
+    )
+    if items:
+        cursor = {"after_id": items[-1].id}
+        if order == "name":
+            cursor["after_name"] = items[-1].name
+        set_next_page_link(request, response, items, limit, **cursor)
+    return items
 
 
 @app.get("/items/{item_id}", response_model=ItemResponse)
-def read_item_endpoint(item_id: int, db: Session = Depends(get_db)):
+async def read_item_endpoint(item_id: int, db: Session | AsyncSession = Depends(get_session)):
     """
     API endpoint to retrieve a single item by ID.
     Delegates to the crud module for database interaction.
     """
-    db_item = get_item(db, item_id=item_id)
+    db_item = await call_crud(db_crud.get_item, db, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 
 
 @app.put("/items/{item_id}", response_model=ItemResponse)
-def update_item_endpoint(item_id: int, item: ItemBase, db: Session = Depends(get_db)):
+async def update_item_endpoint(item_id: int, item: ItemBase, db: Session | AsyncSession = Depends(get_session)):
     """
     API endpoint to update an existing item.
     Delegates to the crud module for database interaction.
     """
-    db_item = update_item(db, item_id=item_id, item=item)
+    db_item = await call_crud(db_crud.update_item, db, item_id=item_id, item=item)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 
 
 @app.delete("/items/{item_id}")
-def delete_item_endpoint(item_id: int, db: Session = Depends(get_db)):
+async def delete_item_endpoint(item_id: int, db: Session | AsyncSession = Depends(get_session)):
     """
     API endpoint to delete an item.
     Delegates to the crud module for database interaction.
     """
-    db_item = delete_item(db, item_id=item_id)
+    db_item = await call_crud(db_crud.delete_item, db, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return {"message": "Item deleted successfully"}
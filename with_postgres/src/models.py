@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String
 
 from .database import Base
 
@@ -24,6 +24,8 @@ class Item(Base):
     Represents the 'items' table in the database.
     """
     __tablename__ = "items"
+    # Backs the keyset pagination of items ordered by name (see crud.items_statement).
+    __table_args__ = (Index("ix_items_name_id", "name", "id"),)
 
     # Unique identifier for the item, serving as the primary key.
     id = Column(Integer, primary_key=True, index=True)
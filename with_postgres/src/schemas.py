@@ -10,6 +10,8 @@ that outgoing responses are formatted correctly.
 - Response models (e.g., PostResponse, ItemResponse) include system-generated fields like IDs.
 """
 
+from typing import Any
+
 from pydantic import BaseModel, ConfigDict, Field
 
 
@@ -43,3 +45,13 @@ class ItemResponse(ItemBase):
     id: int  # Assuming items will also have an ID from the database
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class RejectedRow(BaseModel):
+    index: int = Field(..., description="Position of the row in the request body")
+    errors: list[dict[str, Any]]
+
+
+class BulkIngestResponse(BaseModel):
+    ingested: int = 0
+    rejected: list[RejectedRow] = []
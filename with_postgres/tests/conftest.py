@@ -0,0 +1,67 @@
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+# Settings are read when src is first imported, so the test database has to
+# be configured before that. Both modes run against the same SQLite file: the
+# sync engine through pysqlite, the async one through aiosqlite.
+DATABASE_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["API_VERSION"] = "test"
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE_PATH}"
+os.environ["ASYNC_DB"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from src import crud_async, database, main, models  # noqa: E402
+from src.config import settings  # noqa: E402
+
+
+@pytest.fixture(params=["sync", "async"])
+def db_mode(request, monkeypatch):
+    """
+    Run a test with ASYNC_DB=false, then again with ASYNC_DB=true.
+
+    The async mode is switched on the same way main.py and database.py do it
+    at import time: an aiosqlite engine, AsyncSession, and the async crud module.
+    """
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    if request.param == "sync":
+        yield request.param
+        return
+    async_engine = create_async_engine(database.async_database_url(settings.database_url))
+    monkeypatch.setattr(settings, "async_db", True)
+    monkeypatch.setattr(database, "async_engine", async_engine)
+    monkeypatch.setattr(
+        database, "AsyncSessionLocal", async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    )
+    monkeypatch.setattr(main, "async_engine", async_engine)
+    monkeypatch.setattr(main, "db_crud", crud_async)
+    main.app.dependency_overrides[database.get_db] = database.get_async_db
+    yield request.param
+    main.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client(db_mode):
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def statements(db_mode):
+    """
+    The SQL statements sent to the database, as a list that a test can clear.
+    """
+    executed = []
+    engine = database.async_engine.sync_engine if db_mode == "async" else database.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,174 @@
+import json
+
+import pytest
+
+ITEM = {"name": "Widget", "description": "A widget", "price": 2.5, "tax": 7.0}
+
+
+def create_items(client, *names):
+    return [client.post("/items/", json={**ITEM, "name": name}).json() for name in names]
+
+
+def test_create_post(client):
+    response = client.post("/posts/", json={"title": "Hello", "content": "World"})
+    assert response.status_code == 200
+    post = response.json()
+    assert post["id"] > 0
+    assert post == {"id": post["id"], "title": "Hello", "content": "World"}
+
+
+def test_create_post_rejects_an_empty_title(client):
+    response = client.post("/posts/", json={"title": "", "content": "World"})
+    assert response.status_code == 422
+
+
+def test_read_posts_in_id_order(client):
+    ids = [client.post("/posts/", json={"title": f"Post {n}", "content": "c"}).json()["id"] for n in range(3)]
+    response = client.get("/posts/")
+    assert response.status_code == 200
+    assert [post["id"] for post in response.json()] == ids
+
+
+def test_read_posts_next_page_link(client):
+    ids = [client.post("/posts/", json={"title": f"Post {n}", "content": "c"}).json()["id"] for n in range(3)]
+    response = client.get("/posts/", params={"limit": 2})
+    assert [post["id"] for post in response.json()] == ids[:2]
+    next_url = response.headers["link"].split(";")[0].strip("<>")
+    assert [post["id"] for post in client.get(next_url).json()] == ids[2:]
+
+
+def test_create_and_read_item(client):
+    response = client.post("/items/", json=ITEM)
+    assert response.status_code == 200
+    item = response.json()
+    assert item == {"id": item["id"], **ITEM}
+    assert client.get(f"/items/{item['id']}").json() == item
+
+
+def test_read_missing_item(client):
+    response = client.get("/items/999999")
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Item not found"}
+
+
+@pytest.mark.parametrize("field, value", [("name", ""), ("price", 0), ("tax", 101)])
+def test_create_item_validation(client, field, value):
+    response = client.post("/items/", json={**ITEM, field: value})
+    assert response.status_code == 422
+
+
+def test_read_items_ordered_by_name(client):
+    create_items(client, "b", "c", "a")
+    response = client.get("/items/", params={"order": "name", "limit": 2})
+    assert [item["name"] for item in response.json()] == ["a", "b"]
+    next_url = response.headers["link"].split(";")[0].strip("<>")
+    assert [item["name"] for item in client.get(next_url).json()] == ["c"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"order": "name", "after_id": 1},
+        {"order": "name", "after_name": "a"},
+        {"order": "id", "after_name": "a"},
+    ],
+)
+def test_read_items_rejects_half_a_name_cursor(client, params):
+    create_items(client, "a", "b")
+    response = client.get("/items/", params=params)
+    assert response.status_code == 400
+
+
+def test_update_item(client):
+    (item,) = create_items(client, "Widget")
+    update = {"name": "Gadget", "description": None, "price": 4.0, "tax": None}
+    response = client.put(f"/items/{item['id']}", json=update)
+    assert response.status_code == 200
+    assert response.json() == {"id": item["id"], **update}
+    assert client.get(f"/items/{item['id']}").json() == {"id": item["id"], **update}
+
+
+def test_update_missing_item(client):
+    response = client.put("/items/999999", json=ITEM)
+    assert response.status_code == 404
+
+
+def test_delete_item(client):
+    (item,) = create_items(client, "Widget")
+    response = client.delete(f"/items/{item['id']}")
+    assert response.status_code == 200
+    assert response.json() == {"message": "Item deleted successfully"}
+    assert client.get(f"/items/{item['id']}").status_code == 404
+    assert client.delete(f"/items/{item['id']}").status_code == 404
+
+
+def test_bulk_create_items(client):
+    rows = [ITEM, {**ITEM, "price": -1}, {**ITEM, "name": "Other"}]
+    response = client.post("/items/_bulk", json=rows)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["ingested"] == 2
+    assert [row["index"] for row in result["rejected"]] == [1]
+    assert [item["name"] for item in client.get("/items/").json()] == ["Widget", "Other"]
+
+
+def test_bulk_create_posts_from_ndjson(client):
+    body = '{"title": "One", "content": "c"}\nnot json\n{"title": "Two", "content": "c"}\n'
+    response = client.post("/posts/_bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    result = response.json()
+    assert result["ingested"] == 2
+    assert result["rejected"][0]["index"] == 1
+    assert result["rejected"][0]["errors"][0]["type"] == "json_invalid"
+
+
+def test_export_items(client):
+    items = create_items(client, "a", "b")
+    response = client.get("/items/_export")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == items
+    response = client.get("/items/_export", params={"format": "csv"})
+    assert response.text.splitlines()[0] == "id,name,description,price,tax"
+    assert len(response.text.splitlines()) == 3
+
+
+# Each write is a single statement: INSERT ... RETURNING, UPDATE ... RETURNING
+# or DELETE ... RETURNING, with no SELECT before or after it.
+
+
+def test_create_post_is_one_statement(client, statements):
+    client.post("/posts/", json={"title": "Hello", "content": "World"})
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT")
+
+
+def test_create_item_is_one_statement(client, statements):
+    client.post("/items/", json=ITEM)
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT")
+
+
+@pytest.mark.parametrize("found", [True, False])
+def test_update_item_is_one_statement(client, statements, found):
+    item_id = create_items(client, "Widget")[0]["id"] if found else 999999
+    statements.clear()
+    response = client.put(f"/items/{item_id}", json=ITEM)
+    assert response.status_code == (200 if found else 404)
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE")
+
+
+@pytest.mark.parametrize("found", [True, False])
+def test_delete_item_is_one_statement(client, statements, found):
+    item_id = create_items(client, "Widget")[0]["id"] if found else 999999
+    statements.clear()
+    response = client.delete(f"/items/{item_id}")
+    assert response.status_code == (200 if found else 404)
+    assert len(statements) == 1
+    assert statements[0].startswith("DELETE")
+
+
+def test_bulk_create_posts_is_one_statement_per_batch(client, statements):
+    rows = [{"title": f"Post {n}", "content": "c"} for n in range(3)]
+    assert client.post("/posts/_bulk", json=rows).json()["ingested"] == 3
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT")